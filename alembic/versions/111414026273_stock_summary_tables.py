@@ -0,0 +1,41 @@
+"""stock summary tables
+
+Revision ID: 111414026273
+Revises: 245620d33411
+Create Date: 2026-10-18 17:20:41.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '111414026273'
+down_revision: Union[str, None] = '245620d33411'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stock_product_summary',
+    sa.Column('product_id', sa.UUID(), nullable=False),
+    sa.Column('quantity', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('product_id')
+    )
+
+    op.execute("LOCK TABLE stock IN SHARE MODE")
+    op.execute(
+        "INSERT INTO stock_product_summary (product_id, quantity) "
+        "SELECT s.product_id, sum(s.quantity) FROM stock s "
+        "JOIN warehouse w ON w.id = s.warehouse_id AND w.is_active "
+        "GROUP BY s.product_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('stock_product_summary')
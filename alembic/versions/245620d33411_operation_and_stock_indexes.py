@@ -0,0 +1,41 @@
+"""operation and stock indexes
+
+Revision ID: 245620d33411
+Revises: 9f013c57faa1
+Create Date: 2026-10-18 17:02:14.318520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '245620d33411'
+down_revision: Union[str, None] = '9f013c57faa1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_inventory_operation_from_warehouse_id_created_at', 'inventory_operation', ['from_warehouse_id', 'created_at']),
+    ('ix_inventory_operation_to_warehouse_id_created_at', 'inventory_operation', ['to_warehouse_id', 'created_at']),
+    ('ix_inventory_operation_product_id_created_at', 'inventory_operation', ['product_id', 'created_at']),
+    ('ix_stock_warehouse_id', 'stock', ['warehouse_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY keeps the ledger writable while the indexes build
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,50 @@
+"""operation ingest queue
+
+Revision ID: 8e4b1f09c3a6
+Revises: 5c2e9a41d7f3
+Create Date: 2026-10-18 18:31:52.640183
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4b1f09c3a6'
+down_revision: Union[str, None] = '5c2e9a41d7f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('operation_ingest',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_by', sa.UUID(), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('operation_id', sa.Integer(), nullable=True),
+    sa.Column('detail', sa.Text(), nullable=True),
+    sa.Column('enqueued_at', sa.DateTime(), nullable=False),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_operation_ingest_pending', 'operation_ingest', ['enqueued_at'], unique=False,
+        postgresql_where=sa.text("status = 'pending'")
+    )
+    op.create_index(
+        'uq_operation_ingest_idempotency_key', 'operation_ingest', ['created_by', 'idempotency_key'], unique=True,
+        postgresql_where=sa.text('idempotency_key IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_operation_ingest_idempotency_key', table_name='operation_ingest')
+    op.drop_index('ix_operation_ingest_pending', table_name='operation_ingest')
+    op.drop_table('operation_ingest')
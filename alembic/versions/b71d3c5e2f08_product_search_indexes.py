@@ -0,0 +1,43 @@
+"""product search indexes
+
+Revision ID: b71d3c5e2f08
+Revises: 8e4b1f09c3a6
+Create Date: 2026-10-18 18:58:14.907231
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71d3c5e2f08'
+down_revision: Union[str, None] = '8e4b1f09c3a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_product_sku_trgm', 'product', ['sku'], unique=False,
+            postgresql_using='gin', postgresql_ops={'sku': 'gin_trgm_ops'},
+            postgresql_where=sa.text('is_active'), postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_product_name_trgm', 'product', ['name'], unique=False,
+            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_where=sa.text('is_active'), postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # pg_trgm stays installed; other objects may depend on it
+    with op.get_context().autocommit_block():
+        for name in ('ix_product_name_trgm', 'ix_product_sku_trgm'):
+            op.drop_index(name, table_name='product', postgresql_concurrently=True)
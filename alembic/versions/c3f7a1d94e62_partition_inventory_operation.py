@@ -0,0 +1,130 @@
+"""partition inventory_operation by month
+
+Revision ID: c3f7a1d94e62
+Revises: b71d3c5e2f08
+Create Date: 2026-10-18 21:07:45.118302
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f7a1d94e62'
+down_revision: Union[str, None] = 'b71d3c5e2f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_inventory_operation_from_warehouse_id_created_at', ['from_warehouse_id', 'created_at']),
+    ('ix_inventory_operation_to_warehouse_id_created_at', ['to_warehouse_id', 'created_at']),
+    ('ix_inventory_operation_product_id_created_at', ['product_id', 'created_at']),
+    ('ix_inventory_operation_created_at', ['created_at']),
+]
+COLUMNS = 'id, type, quantity, product_id, from_warehouse_id, to_warehouse_id, created_at, created_by, comment'
+# the app keeps this many future months around from then on
+MONTHS_AHEAD = 3
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_table(name: str, primary_key: list[str], **kwargs) -> None:
+    # the id sequence outlives both layouts and keeps handing out the same ids
+    op.create_table(name,
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('inventory_operation_id_seq')"), nullable=False),
+    sa.Column('type', sa.String(length=20), nullable=False),
+    sa.Column('quantity', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('product_id', sa.UUID(), nullable=False),
+    sa.Column('from_warehouse_id', sa.UUID(), nullable=True),
+    sa.Column('to_warehouse_id', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('created_by', sa.UUID(), nullable=False),
+    sa.Column('comment', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['from_warehouse_id'], ['warehouse.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.ForeignKeyConstraint(['to_warehouse_id'], ['warehouse.id'], ),
+    sa.PrimaryKeyConstraint(*primary_key),
+    **kwargs
+    )
+    op.execute(f"ALTER SEQUENCE inventory_operation_id_seq OWNED BY {name}.id")
+
+
+def _set_aside(table: str) -> None:
+    # frees the index and constraint names for the new table before the copy back
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+    op.execute("ALTER SEQUENCE inventory_operation_id_seq OWNED BY NONE")
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name=f'{table}_old')
+    op.execute(f"ALTER TABLE {table}_old DROP CONSTRAINT {table}_pkey")
+
+
+def _create_indexes() -> None:
+    for name, columns in INDEXES:
+        op.create_index(name, 'inventory_operation', columns, unique=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # the existing ledger is not copied: it becomes the partition for everything
+    # up to the end of next month, so the first month boundary cannot reject a
+    # write while this runs. Its index on (id, created_at) and a CHECK matching
+    # the range are built first without blocking writes, which leaves the
+    # ATTACH below with neither an index build nor a scan to do.
+    current = date.today().replace(day=1)
+    bound = _add_months(current, 2)
+    legacy = f'inventory_operation_p{_add_months(current, 1):%Y_%m}'
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS inventory_operation_id_created_at "
+            "ON inventory_operation (id, created_at)"
+        )
+        op.execute("ALTER TABLE inventory_operation DROP CONSTRAINT IF EXISTS inventory_operation_bounds")
+        op.execute(
+            f"ALTER TABLE inventory_operation ADD CONSTRAINT inventory_operation_bounds "
+            f"CHECK (created_at < '{bound}') NOT VALID"
+        )
+        op.execute("ALTER TABLE inventory_operation VALIDATE CONSTRAINT inventory_operation_bounds")
+
+    op.execute(f"ALTER TABLE inventory_operation RENAME TO {legacy}")
+    op.execute("ALTER SEQUENCE inventory_operation_id_seq OWNED BY NONE")
+    op.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT inventory_operation_pkey")
+    op.execute(
+        f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_pkey PRIMARY KEY USING INDEX inventory_operation_id_created_at"
+    )
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name.replace('inventory_operation', legacy, 1)}")
+
+    _create_table('inventory_operation', ['id', 'created_at'], postgresql_partition_by='RANGE (created_at)')
+    _create_indexes()
+    op.execute(f"ALTER TABLE inventory_operation ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{bound}')")
+    op.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT inventory_operation_bounds")
+
+    # one partition per month from there up to a few months ahead
+    month = bound
+    while month <= _add_months(current, MONTHS_AHEAD):
+        op.execute(
+            f"CREATE TABLE inventory_operation_p{month:%Y_%m} PARTITION OF inventory_operation "
+            f"FOR VALUES FROM ('{month}') TO ('{_add_months(month, 1)}')"
+        )
+        month = _add_months(month, 1)
+    op.execute("CREATE TABLE inventory_operation_default PARTITION OF inventory_operation DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # partitions already archived and dropped are not brought back
+    _set_aside('inventory_operation')
+    _create_table('inventory_operation', ['id'])
+    _create_indexes()
+
+    op.execute(f"INSERT INTO inventory_operation ({COLUMNS}) SELECT {COLUMNS} FROM inventory_operation_old")
+    op.execute("DROP TABLE inventory_operation_old CASCADE")
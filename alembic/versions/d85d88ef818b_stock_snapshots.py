@@ -0,0 +1,50 @@
+"""stock snapshots
+
+Revision ID: d85d88ef818b
+Revises: 111414026273
+Create Date: 2026-10-18 17:48:09.552417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd85d88ef818b'
+down_revision: Union[str, None] = '111414026273'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stock_snapshot_run',
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.Column('last_operation_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('taken_at')
+    )
+    op.create_table('stock_snapshot',
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.Column('product_id', sa.UUID(), nullable=False),
+    sa.Column('warehouse_id', sa.UUID(), nullable=False),
+    sa.Column('quantity', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['taken_at'], ['stock_snapshot_run.taken_at'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('taken_at', 'product_id', 'warehouse_id')
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_inventory_operation_created_at', 'inventory_operation', ['created_at'],
+            unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_inventory_operation_created_at', table_name='inventory_operation', postgresql_concurrently=True
+        )
+    op.drop_table('stock_snapshot')
+    op.drop_table('stock_snapshot_run')
@@ -0,0 +1,54 @@
+"""operation filter indexes
+
+Revision ID: e2a9d6c4b813
+Revises: c3f7a1d94e62
+Create Date: 2026-10-18 22:41:09.527731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a9d6c4b813'
+down_revision: Union[str, None] = 'c3f7a1d94e62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_inventory_operation_from_warehouse_id_product_id_created_at', 'from_product', ['from_warehouse_id', 'product_id', 'created_at']),
+    ('ix_inventory_operation_to_warehouse_id_product_id_created_at', 'to_product', ['to_warehouse_id', 'product_id', 'created_at']),
+    ('ix_inventory_operation_from_warehouse_id_created_by_created_at', 'from_creator', ['from_warehouse_id', 'created_by', 'created_at']),
+    ('ix_inventory_operation_to_warehouse_id_created_by_created_at', 'to_creator', ['to_warehouse_id', 'created_by', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY does not work on a partitioned table: build the parent index
+    # ON ONLY (invalid until complete), then each partition's concurrently and attach it
+    partitions = [name for (name,) in op.get_bind().execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'inventory_operation'::regclass ORDER BY c.relname"
+    ))]
+
+    for name, _, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON ONLY inventory_operation ({', '.join(columns)})")
+
+    with op.get_context().autocommit_block():
+        for name, suffix, columns in INDEXES:
+            for partition in partitions:
+                op.create_index(
+                    f'{partition}_{suffix}_idx', partition, columns, unique=False, postgresql_concurrently=True
+                )
+                op.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition}_{suffix}_idx")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # dropping the parent index takes the attached partition indexes with it
+    for name, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='inventory_operation')
@@ -1,13 +1,21 @@
-from typing import List
+from typing import List, Optional
+from uuid import UUID
 
-from fastapi import APIRouter, status, Depends, HTTPException
+from fastapi import APIRouter, status, Depends, HTTPException, Header, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.dependencies import get_current_user, require_role
 from app.schemas.enums.enums import UserRole
-from app.schemas.rout_schemas.inventory_operations import InventoryOperationCreate
+from app.schemas.rout_schemas.inventory_operations import (
+    InventoryOperationCreate,
+    InventoryOperationBatchCreate,
+    InventoryOperationBatchResult,
+    OperationTicket,
+)
 from app.crud.inventory_oprations import get_inventory_operations_crud, InventoryOperationsCRUD
-from app.db.session import get_session
+from app.crud.operation_ingest import OPERATION_INGEST_ENABLED, OperationIngestCRUD, get_operation_ingest_crud
+from app.db.models import OperationIngest
+from app.db.session import get_session, get_read_session, mark_write
 from app.schemas.rout_schemas.user import UserPublic
 
 router = APIRouter()
@@ -16,6 +24,8 @@ router = APIRouter()
 @router.post("/", status_code=status.HTTP_200_OK)
 async def get_stocks(
     data: InventoryOperationCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255),
     inventory_operations_crud: InventoryOperationsCRUD = Depends(get_inventory_operations_crud),
     session: AsyncSession = Depends(get_session),
     current_user: UserPublic = Depends(require_role(
@@ -23,7 +33,9 @@ async def get_stocks(
         UserRole.manager
     ))
 ):
-    result = await inventory_operations_crud.create_operation(data, current_user.id, session)
+    result = await inventory_operations_crud.create_operation(
+        data, current_user.id, session, idempotency_key=idempotency_key
+    )
 
     if not result:
         raise HTTPException(
@@ -31,4 +43,69 @@ async def get_stocks(
             detail="Error while creating new operation"
         )
 
-    return {"detail": "Operations successfully created"}
\ No newline at end of file
+    mark_write(response)
+    return {"detail": "Operations successfully created"}
+
+
+@router.post("/batch", status_code=status.HTTP_200_OK, response_model=InventoryOperationBatchResult)
+async def create_operations_batch(
+    data: InventoryOperationBatchCreate,
+    response: Response,
+    inventory_operations_crud: InventoryOperationsCRUD = Depends(get_inventory_operations_crud),
+    session: AsyncSession = Depends(get_session),
+    current_user: UserPublic = Depends(require_role(
+        UserRole.admin,
+        UserRole.manager
+    ))
+):
+    result = await inventory_operations_crud.create_operations_batch(data, current_user.id, session)
+    mark_write(response)
+    return result
+
+
+@router.post("/async", status_code=status.HTTP_202_ACCEPTED, response_model=OperationTicket)
+async def enqueue_operation(
+    data: InventoryOperationCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=255),
+    operation_ingest_crud: OperationIngestCRUD = Depends(get_operation_ingest_crud),
+    session: AsyncSession = Depends(get_session),
+    current_user: UserPublic = Depends(require_role(
+        UserRole.admin,
+        UserRole.manager
+    ))
+):
+    if not OPERATION_INGEST_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Async ingest is disabled"
+        )
+
+    ticket = await operation_ingest_crud.enqueue(
+        data, current_user.id, session, idempotency_key=idempotency_key
+    )
+    mark_write(response)
+    return ticket
+
+
+@router.get("/async/{ticket_id}", status_code=status.HTTP_200_OK, response_model=OperationTicket)
+async def get_operation_ticket(
+    ticket_id: UUID,
+    operation_ingest_crud: OperationIngestCRUD = Depends(get_operation_ingest_crud),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: UserPublic = Depends(require_role(
+        UserRole.admin,
+        UserRole.manager
+    ))
+):
+    ticket = await operation_ingest_crud.get_object_by_unic_field(
+        ticket_id, OperationIngest.id, session
+    )
+
+    if not ticket or (ticket.created_by != current_user.id and current_user.role != UserRole.admin.value):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ticket not found"
+        )
+
+    return ticket
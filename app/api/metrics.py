@@ -0,0 +1,41 @@
+from fastapi import APIRouter, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import REGISTRY, render_gauge
+from app.db.session import engine, read_engine
+
+router = APIRouter()
+
+# point-in-time pool state; the running totals are counters and a histogram in REGISTRY
+POOL_GAUGES = ("pool_size", "checked_out", "checked_in", "overflow")
+
+
+def _pool_metrics() -> dict:
+    metrics = {"primary": engine.sync_engine.pool.metrics()}
+
+    if read_engine is not engine:
+        metrics["replica"] = read_engine.sync_engine.pool.metrics()
+
+    return metrics
+
+
+@router.get("", status_code=status.HTTP_200_OK, response_class=PlainTextResponse)
+async def get_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+
+    pools = _pool_metrics()
+    for key in POOL_GAUGES:
+        lines.extend(render_gauge(
+            f"db_pool_{key.removeprefix('pool_')}",
+            f"Connection pool {key.replace('_', ' ')}",
+            [({"engine": name}, values[key]) for name, values in pools.items()],
+        ))
+
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+
+@router.get("/pool", status_code=status.HTTP_200_OK)
+async def get_pool_metrics():
+    return _pool_metrics()
@@ -1,16 +1,20 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, status, Depends, HTTPException
+from fastapi import APIRouter, status, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.rout_schemas.product import ProductCreate, ProductUpdate, ProductPublic
+from app.schemas.rout_schemas.pagination import Page
+from app.schemas.rout_schemas.batch import IdsLookup, LookupResult
 from app.schemas.rout_schemas.user import UserPublic
 from app.crud.product import ProductCRUD
 from app.auth.dependencies import require_role
-from app.db.session import get_session
+from app.db.session import get_session, get_read_session
 from app.db.models import Product
 from app.schemas.enums.enums import UserRole
+from app.utils.responses import model_response
+from app.utils.lookup import lookup_result
 
 router = APIRouter()
 
@@ -35,21 +39,41 @@ async def create_product(
     return await product_crud.write_to_db(product_data, session)
 
 
-@router.get("/", status_code=status.HTTP_200_OK, response_model=List[ProductPublic])
+@router.get("/", status_code=status.HTTP_200_OK, response_model=Page[ProductPublic])
 async def get_products(
-    offset: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 10,
     product_crud: ProductCRUD = Depends(ProductCRUD),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
-    return await product_crud.get_objects(session, offset, limit)
+    return model_response(Page[ProductPublic], await product_crud.get_page(session, cursor, limit))
+
+
+@router.get("/search", status_code=status.HTTP_200_OK, response_model=List[ProductPublic])
+async def search_products(
+    q: str = Query(min_length=3, max_length=100, description="Part of the product sku or name"),
+    limit: int = Query(20, gt=0, le=100),
+    product_crud: ProductCRUD = Depends(ProductCRUD),
+    session: AsyncSession = Depends(get_read_session)
+):
+    return model_response(List[ProductPublic], await product_crud.search(q, session, limit))
+
+
+@router.post("/batch", status_code=status.HTTP_200_OK, response_model=LookupResult[ProductPublic, UUID])
+async def get_products_batch(
+    data: IdsLookup,
+    product_crud: ProductCRUD = Depends(ProductCRUD),
+    session: AsyncSession = Depends(get_read_session)
+):
+    products = await product_crud.get_objects_by_ids(data.ids, session)
+    return model_response(LookupResult[ProductPublic, UUID], lookup_result(data.ids, products))
 
 
 @router.get("/{product_id}", status_code=status.HTTP_200_OK, response_model=ProductPublic)
 async def get_product(
     product_id: UUID,
     product_crud: ProductCRUD = Depends(ProductCRUD),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     product = await product_crud.get_object_by_unic_field(
         product_id, Product.id, session
@@ -1,30 +1,176 @@
-from typing import List
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
 
-from fastapi import APIRouter, status, Depends, HTTPException
+from fastapi import APIRouter, status, Depends, HTTPException, WebSocket
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from app.schemas.rout_schemas.stock import StockPublic
+from app.schemas.rout_schemas.stock import (
+    StockPublic,
+    ProductStockSummary,
+    WarehouseStockSummary,
+    StockAsOf,
+    StockSnapshotTaken,
+    StockKey,
+    StockLookup,
+)
+from app.schemas.rout_schemas.user import UserPublic
+from app.schemas.rout_schemas.pagination import Page
+from app.schemas.rout_schemas.batch import LookupResult
 from app.utils.stock_filters import stock_filters
+from app.utils.export import export_response
+from app.utils.responses import model_response
+from app.utils.datetimes import naive_local
+from app.utils.lookup import lookup_result
+from app.schemas.enums.enums import ExportFormat, UserRole
 from app.crud.stock import StockCRUD
-from app.db.session import get_session
+from app.crud.stock_summary import StockSummaryCRUD, get_stock_summary_crud
+from app.crud.stock_history import StockHistoryCRUD, get_stock_history_crud
+from app.auth.dependencies import require_role
+from app.core.stock_feed import STOCK_EVENTS_NOTIFY, stock_feed
+from app.db.session import get_session, get_read_session
+from app.db.models import Stock
 
 router = APIRouter()
 
 
-@router.get("/", status_code=status.HTTP_200_OK, response_model=List[StockPublic])
+@router.get("/", status_code=status.HTTP_200_OK, response_model=Page[StockPublic])
 async def get_stocks(
-    offset: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 10,
     filters: list = Depends(stock_filters),
     stock_crud: StockCRUD = Depends(StockCRUD),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
-    if offset < 0 or limit < 0:
+    page = await stock_crud.get_page(
+        session, cursor, limit, filters,
+        options=[joinedload(Stock.product), joinedload(Stock.warehouse)],
+    )
+    return model_response(Page[StockPublic], page)
+
+
+@router.post("/lookup", status_code=status.HTTP_200_OK, response_model=LookupResult[StockPublic, StockKey])
+async def lookup_stocks(
+    data: StockLookup,
+    stock_crud: StockCRUD = Depends(StockCRUD),
+    session: AsyncSession = Depends(get_read_session)
+):
+    keys = [(key.product_id, key.warehouse_id) for key in data.keys]
+    stocks = await stock_crud.get_stocks_by_keys(
+        keys, session,
+        options=[joinedload(Stock.product), joinedload(Stock.warehouse)],
+    )
+    result = lookup_result(keys, stocks)
+    result["missing"] = [
+        {"product_id": product_id, "warehouse_id": warehouse_id}
+        for product_id, warehouse_id in result["missing"]
+    ]
+    return model_response(LookupResult[StockPublic, StockKey], result)
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_stocks(
+    format: ExportFormat = ExportFormat.ndjson,
+    filters: list = Depends(stock_filters),
+    stock_crud: StockCRUD = Depends(StockCRUD),
+):
+    return export_response(stock_crud.export_query(filters), format, "stock")
+
+
+@router.get("/summary/products/{product_id}", status_code=status.HTTP_200_OK, response_model=ProductStockSummary)
+async def get_product_stock_summary(
+    product_id: UUID,
+    stock_summary_crud: StockSummaryCRUD = Depends(get_stock_summary_crud),
+    session: AsyncSession = Depends(get_read_session)
+):
+    quantity = await stock_summary_crud.get_product_quantity(product_id, session)
+    return {"product_id": product_id, "quantity": quantity}
+
+
+@router.get("/summary/warehouses/{warehouse_id}", status_code=status.HTTP_200_OK, response_model=WarehouseStockSummary)
+async def get_warehouse_stock_summary(
+    warehouse_id: UUID,
+    stock_summary_crud: StockSummaryCRUD = Depends(get_stock_summary_crud),
+    session: AsyncSession = Depends(get_read_session)
+):
+    quantity = await stock_summary_crud.get_warehouse_quantity(warehouse_id, session)
+    return {"warehouse_id": warehouse_id, "quantity": quantity}
+
+
+@router.get("/as-of", status_code=status.HTTP_200_OK, response_model=List[StockAsOf])
+async def get_stock_as_of(
+    at: datetime,
+    product_id: Optional[UUID] = None,
+    warehouse_id: Optional[UUID] = None,
+    stock_history_crud: StockHistoryCRUD = Depends(get_stock_history_crud),
+    session: AsyncSession = Depends(get_read_session)
+):
+    quantities = await stock_history_crud.get_stock_as_of(naive_local(at), session, product_id, warehouse_id)
+
+    if quantities is None:
         raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail="offset and limit must be greater than 0"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No stock snapshot before this date"
         )
 
-    return await stock_crud.get_objects(session, offset, limit, filters)
+    return model_response(List[StockAsOf], [
+        {"product_id": product, "warehouse_id": warehouse, "quantity": quantity}
+        for (product, warehouse), quantity in sorted(quantities.items())
+    ])
+
+
+@router.post("/snapshots", status_code=status.HTTP_201_CREATED, response_model=StockSnapshotTaken)
+async def take_stock_snapshot(
+    stock_history_crud: StockHistoryCRUD = Depends(get_stock_history_crud),
+    session: AsyncSession = Depends(get_session),
+    current_user: UserPublic = Depends(require_role(UserRole.admin))
+):
+    taken_at = await stock_history_crud.take_snapshot(session)
+
+    if taken_at is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another snapshot is in progress"
+        )
+
+    return {"taken_at": taken_at}
+
+
+@router.websocket("/ws")
+async def stock_changes(
+    websocket: WebSocket,
+    product_id: Optional[UUID] = None,
+    warehouse_id: Optional[UUID] = None,
+):
+    if not STOCK_EVENTS_NOTIFY:
+        # nothing would ever arrive on this socket
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Stock events are disabled")
+        return
+
+    await websocket.accept()
+    subscription = stock_feed.subscribe(product_id, warehouse_id)
+
+    async def forward():
+        while True:
+            await websocket.send_text(await subscription.queue.get())
 
+    async def receive():
+        # nothing is expected from the client; this only notices the disconnect
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
 
+    tasks = {asyncio.create_task(forward()), asyncio.create_task(receive())}
+    try:
+        # a disconnect or a failed send, whichever comes first, ends the subscription
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        stock_feed.unsubscribe(subscription)
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # a failed send just means the client is gone; reading the
+                # exception keeps asyncio from logging it as never retrieved
+                task.exception()
@@ -3,11 +3,13 @@ from uuid import UUID
 from fastapi import APIRouter, status, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.dependencies import get_current_user, require_role
+from app.auth.cache import invalidate_user
+from app.auth.dependencies import get_current_user, require_role, login_slot
 from app.schemas.enums.enums import UserRole
 from app.schemas.rout_schemas.user import UserCreate, UserPublic, UserLogin
 from app.db.session import get_session
 from app.crud.user import UserCRUD
+from app.db.models import User
 from app.auth.tokens import create_access_token
 
 
@@ -31,7 +33,7 @@ async def register_user(
     return await user_crud.write_to_db(user_data, session)
 
 
-@router.post("/login/", status_code=status.HTTP_200_OK)
+@router.post("/login/", status_code=status.HTTP_200_OK, dependencies=[Depends(login_slot)])
 async def login_user(
     login_data: UserLogin,
     response: Response,
@@ -74,7 +76,7 @@ async def change_user_role(
     session: AsyncSession = Depends(get_session),
     current_user: UserPublic = Depends(require_role(UserRole.admin)),
 ):
-    user = await user_crud.get_object_by_id(user_id, session)
+    user = await user_crud.get_object_by_unic_field(user_id, User.id, session)
 
     if not user:
         raise HTTPException(
@@ -85,3 +87,23 @@ async def change_user_role(
     user.role = new_role.value
     await session.commit()
     await session.refresh(user)
+    invalidate_user(user.id)
+
+
+@router.patch("/deactivate/{user_id}", status_code=status.HTTP_200_OK, response_model=UserPublic)
+async def deactivate_user(
+    user_id: UUID,
+    user_crud: UserCRUD = Depends(UserCRUD),
+    session: AsyncSession = Depends(get_session),
+    current_user: UserPublic = Depends(require_role(UserRole.admin)),
+):
+    user = await user_crud.get_object_by_unic_field(user_id, User.id, session)
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    await user_crud.deactivate_object(user_id, session)
+    return user
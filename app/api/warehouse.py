@@ -1,4 +1,4 @@
-from typing import List
+from typing import Optional
 from uuid import UUID
 
 from fastapi import APIRouter, status, Depends, HTTPException
@@ -7,12 +7,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.rout_schemas.warehouse import WarehouseCreate, WarehousePublic, WarehouseUpdate
 from app.schemas.rout_schemas.user import UserPublic
 from app.schemas.rout_schemas.inventory_operations import InventoryOperationsPublic
+from app.schemas.rout_schemas.pagination import Page
+from app.schemas.rout_schemas.batch import IdsLookup, LookupResult
 from app.crud.warehouse import WarehouseCRUD
 from app.crud.inventory_oprations import InventoryOperationsCRUD, get_inventory_operations_crud
 from app.auth.dependencies import require_role
-from app.db.session import get_session
+from app.db.session import get_session, get_read_session
 from app.db.models import Warehouse
-from app.schemas.enums.enums import UserRole
+from app.schemas.enums.enums import UserRole, ExportFormat
+from app.utils.export import export_response
+from app.utils.operation_filters import OperationFilters, operation_filters
+from app.utils.responses import model_response
+from app.utils.lookup import lookup_result
 
 router = APIRouter()
 
@@ -40,11 +46,21 @@ async def create_warehouse(
     return await warehouse_crud.write_to_db(data, session)
 
 
+@router.post("/batch", status_code=status.HTTP_200_OK, response_model=LookupResult[WarehousePublic, UUID])
+async def get_warehouses_batch(
+    data: IdsLookup,
+    warehouse_crud: WarehouseCRUD = Depends(WarehouseCRUD),
+    session: AsyncSession = Depends(get_read_session)
+):
+    warehouses = await warehouse_crud.get_objects_by_ids(data.ids, session)
+    return model_response(LookupResult[WarehousePublic, UUID], lookup_result(data.ids, warehouses))
+
+
 @router.get("/{warehouse_id}", status_code=status.HTTP_200_OK, response_model=WarehousePublic)
 async def get_warehouse(
     warehouse_id: UUID,
     warehouse_crud: WarehouseCRUD = Depends(WarehouseCRUD),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     warehouse = await warehouse_crud.get_object_by_unic_field(
         warehouse_id, Warehouse.id, session
@@ -59,14 +75,14 @@ async def get_warehouse(
     return warehouse
 
 
-@router.get("/", status_code=status.HTTP_200_OK, response_model=List[WarehousePublic])
+@router.get("/", status_code=status.HTTP_200_OK, response_model=Page[WarehousePublic])
 async def get_warehouses(
-    offset: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 5,
     warehouse_crud: WarehouseCRUD = Depends(WarehouseCRUD),
-    session: AsyncSession = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
-    return await warehouse_crud.get_objects(session, offset, limit)
+    return model_response(Page[WarehousePublic], await warehouse_crud.get_page(session, cursor, limit))
 
 
 @router.patch("/{warehouse_id}", status_code=status.HTTP_200_OK, response_model=WarehousePublic)
@@ -123,15 +139,44 @@ async def warehouse_deactivate(
     return warehouse
 
 
-@router.get("/{warehouse_id}/operations", status_code=status.HTTP_200_OK, response_model=List[InventoryOperationsPublic])
+@router.get("/{warehouse_id}/operations", status_code=status.HTTP_200_OK, response_model=Page[InventoryOperationsPublic])
 async def get_warehouse_operations(
     warehouse_id: UUID,
-    offset: int = 0,
+    cursor: Optional[str] = None,
     limit: int = 10,
+    filters: OperationFilters = Depends(operation_filters),
     warehouse_crud: WarehouseCRUD = Depends(WarehouseCRUD),
     inventory_operations_crud: InventoryOperationsCRUD = Depends(get_inventory_operations_crud),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
+):
+    page = await warehouse_crud.get_operations_by_warehouse_id(
+        warehouse_id, session, inventory_operations_crud, cursor=cursor, limit=limit, desc=True,
+        filters=filters,
+    )
+    return model_response(Page[InventoryOperationsPublic], page)
+
+
+@router.get("/{warehouse_id}/operations/export", status_code=status.HTTP_200_OK)
+async def export_warehouse_operations(
+    warehouse_id: UUID,
+    format: ExportFormat = ExportFormat.ndjson,
+    filters: OperationFilters = Depends(operation_filters),
+    warehouse_crud: WarehouseCRUD = Depends(WarehouseCRUD),
+    inventory_operations_crud: InventoryOperationsCRUD = Depends(get_inventory_operations_crud),
+    session: AsyncSession = Depends(get_read_session),
 ):
-    return await warehouse_crud.get_operations_by_warehouse_id(
-        warehouse_id, session, inventory_operations_crud, offset=offset, limit=limit, desc=True
+    warehouse = await warehouse_crud.get_object_by_unic_field(
+        warehouse_id, Warehouse.id, session
+    )
+
+    if not warehouse:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Warehouse not found"
+        )
+
+    return export_response(
+        inventory_operations_crud.warehouse_operations_export_query(warehouse_id, filters),
+        format,
+        f"warehouse_{warehouse_id}_operations",
     )
@@ -0,0 +1,15 @@
+from uuid import UUID
+
+from decouple import config
+
+from app.utils.ttl_cache import TTLCache
+
+
+principal_cache = TTLCache(
+    maxsize=config("AUTH_CACHE_SIZE", default=10000, cast=int),
+    ttl=config("AUTH_CACHE_TTL_SECONDS", default=60, cast=int),
+)
+
+
+def invalidate_user(user_id: UUID):
+    principal_cache.discard_where(lambda user: user.id == user_id)
@@ -1,22 +1,36 @@
+import asyncio
+import time
+
+from decouple import config
 from  fastapi import Request, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.user import UserCRUD
 from app.db.session import get_session
+from app.auth.cache import principal_cache
 from app.auth.tokens import decode_token
 from app.schemas.rout_schemas.user import UserPublic
 
 
+LOGIN_CONCURRENCY = config("LOGIN_CONCURRENCY", default=16, cast=int)
+
+_login_slots = asyncio.Semaphore(LOGIN_CONCURRENCY)
+
+
 async def get_current_user(
     request: Request,
     session: AsyncSession = Depends(get_session),
     user_crud: UserCRUD = Depends(UserCRUD),
 ):
-    try:
-        token = request.cookies.get("access_token")
-        payload = decode_token(token)
-    except:
+    token = request.cookies.get("access_token")
+
+    if not token:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+    user = principal_cache.get(token)
+    if user is not None:
+        return user
+
     payload = decode_token(token)
 
     if not payload:
@@ -31,7 +45,13 @@ async def get_current_user(
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
-    return user
+    if not user.is_active:
+        raise HTTPException(status_code=401, detail="User is inactive")
+
+    # a snapshot, not the ORM row: the cached value outlives the session it was loaded in
+    principal = UserPublic.model_validate(user)
+    principal_cache.set(token, principal, ttl=payload["exp"] - time.time())
+    return principal
 
 
 def require_role(*allowed_role):
@@ -48,3 +68,15 @@ def require_role(*allowed_role):
         return current_user
 
     return role_checker
+
+
+async def login_slot():
+    if _login_slots.locked():
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many concurrent logins",
+            headers={"Retry-After": "1"},
+        )
+
+    async with _login_slots:
+        yield
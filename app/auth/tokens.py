@@ -4,21 +4,26 @@ from typing import Optional
 from decouple import config
 
 
+SECRET_KEY = config("SECRET_KEY")
+ALGORITHM = config("ALGORITHM")
+ACCESS_TOKEN_EXPIRE_MINUTES = config("ACCESS_TOKEN_EXPIRE_MINUTES", cast=int)
+
+
 def create_access_token(
     data: dict,
     expires_delta: Optional[timedelta] = None
 ):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (
-        expires_delta or timedelta(minutes=int(config("ACCESS_TOKEN_EXPIRE_MINUTES")))
+        expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, config("SECRET_KEY"), algorithm=config("ALGORITHM"))
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
 def decode_token(token: str):
     try:
-        payload = jwt.decode(token, config("SECRET_KEY"), algorithms=config("ALGORITHM"))
+        payload = jwt.decode(token, SECRET_KEY, algorithms=ALGORITHM)
         return payload
     except JWTError:
         return None
@@ -0,0 +1,77 @@
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Hashable
+
+
+# Coalesces concurrent submissions for the same key into one apply call.
+# Items for a key are collected for `window` seconds (or until `max_batch`
+# are waiting) and handed to `apply` together; `apply` must return one
+# result per item, in order. Different keys are flushed independently.
+# `apply` runs in an empty context, not in the context of whichever caller
+# happened to submit first, so per-request context variables stay per request.
+class KeyedBatcher:
+
+    def __init__(
+        self,
+        apply: Callable[[list], Awaitable[list]],
+        window: float,
+        max_batch: int,
+        on_flush: Callable[[int], None] | None = None,
+    ):
+        self.apply = apply
+        self.window = window
+        self.max_batch = max_batch
+        self.on_flush = on_flush
+        self._pending: dict[Hashable, list[tuple[Any, asyncio.Future]]] = {}
+        self._full: dict[Hashable, asyncio.Event] = {}
+        self._flushers: dict[Hashable, asyncio.Task] = {}
+
+    async def submit(self, key: Hashable, item):
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((item, future))
+
+        if key not in self._flushers:
+            self._full[key] = asyncio.Event()
+            self._flushers[key] = contextvars.Context().run(asyncio.create_task, self._flush(key))
+        elif len(pending) >= self.max_batch:
+            self._full[key].set()
+
+        return await future
+
+    async def _flush(self, key: Hashable):
+        try:
+            while self._pending.get(key):
+                try:
+                    await asyncio.wait_for(self._full[key].wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+
+                pending = self._pending[key]
+                batch, self._pending[key] = pending[:self.max_batch], pending[self.max_batch:]
+                if len(self._pending[key]) < self.max_batch:
+                    self._full[key].clear()
+
+                await self._apply(batch)
+        finally:
+            for _, future in self._pending.pop(key, None) or []:
+                if not future.done():
+                    future.set_exception(RuntimeError("Batcher stopped"))
+            self._full.pop(key, None)
+            self._flushers.pop(key, None)
+
+    async def _apply(self, batch: list[tuple[Any, asyncio.Future]]):
+        if self.on_flush is not None:
+            self.on_flush(len(batch))
+
+        try:
+            results = await self.apply([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
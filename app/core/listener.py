@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from typing import Callable
+
+import asyncpg
+from decouple import config
+from sqlalchemy.engine import make_url
+
+
+logger = logging.getLogger(__name__)
+
+# LISTEN needs a session-level connection, so point this past pgbouncer if one is in use
+LISTEN_DATABASE_URL = config("LISTEN_DATABASE_URL", default=config("DATABASE_URL"))
+LISTEN_RECONNECT_SECONDS = config("LISTEN_RECONNECT_SECONDS", default=5, cast=float)
+
+
+class PgListener:
+    # One LISTEN connection per worker, shared by every channel subscriber.
+
+    def __init__(self, url: str):
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.callbacks: dict[str, list[Callable[[str], None]]] = {}
+        self.gap_callbacks: list[Callable[[], None]] = []
+
+    def subscribe(self, channel: str, callback: Callable[[str], None], on_gap: Callable[[], None] | None = None):
+        self.callbacks.setdefault(channel, []).append(callback)
+        if on_gap is not None:
+            self.gap_callbacks.append(on_gap)
+
+    def _dispatch(self, connection, pid, channel: str, payload: str):
+        for callback in self.callbacks.get(channel, []):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("Listener callback for %s failed", channel)
+
+    def _gap(self):
+        # notifications sent while disconnected are lost; let subscribers resync
+        for callback in self.gap_callbacks:
+            callback()
+
+    async def run(self):
+        while True:
+            closed = asyncio.Event()
+            try:
+                connection = await asyncpg.connect(self.dsn)
+            except (OSError, asyncpg.PostgresError):
+                logger.exception("LISTEN connection failed")
+                await asyncio.sleep(LISTEN_RECONNECT_SECONDS)
+                continue
+
+            try:
+                connection.add_termination_listener(lambda _: closed.set())
+                for channel in self.callbacks:
+                    await connection.add_listener(channel, self._dispatch)
+
+                self._gap()
+                await closed.wait()
+                logger.warning("LISTEN connection lost, reconnecting")
+            finally:
+                if not connection.is_closed():
+                    await connection.close()
+
+            await asyncio.sleep(LISTEN_RECONNECT_SECONDS)
+
+
+pg_listener = PgListener(LISTEN_DATABASE_URL)
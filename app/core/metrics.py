@@ -0,0 +1,170 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from decouple import config
+from sqlalchemy import event
+
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = config("SLOW_QUERY_MS", default=0, cast=float)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+BATCH_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: dict | None = None, value: float = 1):
+        key = tuple(sorted((labels or {}).items()))
+        self.values[key] = self.values.get(key, 0) + value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(dict(key))} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, description: str, buckets: tuple):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, labels: dict, value: float):
+        key = tuple(sorted(labels.items()))
+        counts, total = self.series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        counts[-1] += 1
+        total[0] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+
+        for key, (counts, total) in self.series.items():
+            labels = dict(key)
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {counts[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total[0]}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {counts[-1]}")
+
+        return lines
+
+
+def render_gauge(name: str, description: str, samples: list[tuple[dict, float]]) -> list[str]:
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    return lines
+
+
+REQUESTS_TOTAL = Counter("http_requests_total", "HTTP requests by route and status")
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", LATENCY_BUCKETS
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Time spent in the database per request", LATENCY_BUCKETS
+)
+REQUEST_STATEMENTS = Histogram(
+    "http_request_db_statements", "SQL statements executed per request", STATEMENT_BUCKETS
+)
+SLOW_QUERIES_TOTAL = Counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS")
+HOT_STOCK_BATCH_SIZE = Histogram(
+    "hot_stock_batch_size", "Operations applied per coalesced hot SKU update", BATCH_BUCKETS
+)
+REFERENCE_CACHE_REQUESTS = Counter(
+    "reference_cache_requests_total", "Product and warehouse lookups served by the reference cache"
+)
+# _count and _sum are the checkouts and the total time spent waiting for them
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection", LATENCY_BUCKETS
+)
+DB_POOL_OVERFLOW_CONNECTIONS = Counter(
+    "db_pool_overflow_connections_total", "Connections opened beyond the pool size"
+)
+
+REGISTRY = [
+    REQUESTS_TOTAL,
+    REQUEST_DURATION,
+    REQUEST_DB_DURATION,
+    REQUEST_STATEMENTS,
+    SLOW_QUERIES_TOTAL,
+    HOT_STOCK_BATCH_SIZE,
+    REFERENCE_CACHE_REQUESTS,
+    DB_POOL_WAIT,
+    DB_POOL_OVERFLOW_CONNECTIONS,
+]
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: str | None = None
+
+    def record(self, statement: str, elapsed: float):
+        self.statements += 1
+        self.db_seconds += elapsed
+
+        if elapsed > self.slowest_seconds:
+            self.slowest_seconds = elapsed
+            self.slowest_statement = statement
+
+    def server_timing(self, total_seconds: float) -> str:
+        return ", ".join([
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.statements} statements"',
+            f"db-slowest;dur={self.slowest_seconds * 1000:.2f}",
+            f"total;dur={total_seconds * 1000:.2f}",
+        ])
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def observe_request(method: str, route: str, status_code: int, elapsed: float, stats: RequestStats):
+    labels = {"method": method, "route": route}
+    REQUESTS_TOTAL.inc({**labels, "status": status_code})
+    REQUEST_DURATION.observe(labels, elapsed)
+    REQUEST_DB_DURATION.observe(labels, stats.db_seconds)
+    REQUEST_STATEMENTS.observe(labels, stats.statements)
+
+
+def instrument_engine(engine):
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._query_started
+
+        stats = request_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            SLOW_QUERIES_TOTAL.inc()
+            logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement)
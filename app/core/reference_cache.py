@@ -0,0 +1,75 @@
+import time
+from typing import Any, Hashable
+
+from decouple import config
+from sqlalchemy import inspect, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.metrics import REFERENCE_CACHE_REQUESTS
+from app.utils.ttl_cache import TTLCache
+
+
+REFERENCE_CACHE_SIZE = config("REFERENCE_CACHE_SIZE", default=10000, cast=int)
+REFERENCE_CACHE_TTL_SECONDS = config("REFERENCE_CACHE_TTL_SECONDS", default=30, cast=float)
+REFERENCE_CACHE_NOTIFY = config("REFERENCE_CACHE_NOTIFY", default=False, cast=bool)
+REFERENCE_CACHE_CHANNEL = "reference_cache"
+# a replica may still serve the old row this long after a write
+REPLICA_LAG_SECONDS = config("READ_YOUR_WRITES_SECONDS", default=5, cast=int)
+
+
+class ReferenceCache:
+    # Entries are tagged with the table version they were read under. A write
+    # bumps the version, which drops every entry of that table at once and
+    # keeps a read that raced the write from caching what it saw.
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.versions: dict[str, int] = {}
+        self.invalidated_at: dict[str, float] = {}
+
+    def version(self, model) -> int:
+        return self.versions.get(model.__tablename__, 0)
+
+    def get(self, model, field: str, value: Hashable) -> dict[str, Any] | None:
+        entry = self.entries.get((model.__tablename__, field, value))
+        hit = entry is not None and entry[0] == self.version(model)
+
+        REFERENCE_CACHE_REQUESTS.inc({"table": model.__tablename__, "result": "hit" if hit else "miss"})
+        return entry[1] if hit else None
+
+    def set(self, obj, version: int, fields: list[str], from_replica: bool = False):
+        model = type(obj)
+        if version != self.version(model):
+            return
+
+        if from_replica and time.monotonic() - self.invalidated_at.get(model.__tablename__, 0) < REPLICA_LAG_SECONDS:
+            return
+
+        values = {attr.key: getattr(obj, attr.key) for attr in inspect(model).column_attrs}
+        for field in fields:
+            self.entries.set((model.__tablename__, field, values[field]), (version, values))
+
+    async def load(self, model, values: dict[str, Any], session: AsyncSession):
+        # attach a copy without a SELECT; the cached dict itself is never handed out
+        obj = model(**values)
+        make_transient_to_detached(obj)
+        return await session.merge(obj, load=False)
+
+    def invalidate_table(self, table_name: str):
+        self.versions[table_name] = self.versions.get(table_name, 0) + 1
+        self.invalidated_at[table_name] = time.monotonic()
+
+    def invalidate(self, model):
+        self.invalidate_table(model.__tablename__)
+
+    async def publish(self, model, session: AsyncSession):
+        # NOTIFY is transactional: other workers hear about it only on commit
+        if REFERENCE_CACHE_NOTIFY:
+            await session.execute(select(func.pg_notify(REFERENCE_CACHE_CHANNEL, model.__tablename__)))
+
+    def clear(self):
+        self.entries.clear()
+
+
+reference_cache = ReferenceCache(maxsize=REFERENCE_CACHE_SIZE, ttl=REFERENCE_CACHE_TTL_SECONDS)
@@ -0,0 +1,71 @@
+import asyncio
+import json
+from uuid import UUID
+
+from decouple import config
+
+
+# NOTIFY serializes committing transactions on a global queue lock, so stock
+# writes only pay for it when the WebSocket feed is turned on
+STOCK_EVENTS_NOTIFY = config("STOCK_EVENTS_NOTIFY", default=False, cast=bool)
+STOCK_EVENTS_CHANNEL = "stock_changes"
+STOCK_FEED_QUEUE_SIZE = config("STOCK_FEED_QUEUE_SIZE", default=1000, cast=int)
+
+RESYNC = json.dumps({"type": "resync"})
+
+
+class StockSubscription:
+    def __init__(self, product_id: UUID | None, warehouse_id: UUID | None):
+        self.product_id = str(product_id) if product_id else None
+        self.warehouse_id = str(warehouse_id) if warehouse_id else None
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=STOCK_FEED_QUEUE_SIZE)
+
+    def matches(self, event: dict) -> bool:
+        return (
+            (self.product_id is None or event["product_id"] == self.product_id)
+            and (self.warehouse_id is None or event["warehouse_id"] == self.warehouse_id)
+        )
+
+    def push(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # a client that can't keep up loses its backlog and is told to refetch
+            self.resync()
+
+    def resync(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESYNC)
+
+
+class StockFeed:
+    # Fans stock_changes notifications from the worker's single LISTEN
+    # connection out to every matching subscriber.
+
+    def __init__(self):
+        self.subscriptions: set[StockSubscription] = set()
+
+    def subscribe(self, product_id: UUID | None = None, warehouse_id: UUID | None = None) -> StockSubscription:
+        subscription = StockSubscription(product_id, warehouse_id)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: StockSubscription):
+        self.subscriptions.discard(subscription)
+
+    def dispatch(self, payload: str):
+        if not self.subscriptions:
+            return
+
+        event = json.loads(payload)
+        for subscription in self.subscriptions:
+            if subscription.matches(event):
+                subscription.push(payload)
+
+    def resync(self):
+        for subscription in self.subscriptions:
+            subscription.resync()
+
+
+stock_feed = StockFeed()
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Coroutine
+
+
+logger = logging.getLogger(__name__)
+
+background_tasks: set[asyncio.Task] = set()
+
+
+async def _run_periodically(name: str, interval_seconds: float, job: Callable[[], Awaitable]):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await job()
+        except Exception:
+            logger.exception("Periodic task %s failed", name)
+
+
+async def _run_continuously(name: str, idle_seconds: float, job: Callable[[], Awaitable[int]]):
+    # job returns how much work it did; sleep only when there was nothing to do
+    while True:
+        try:
+            done = await job()
+        except Exception:
+            logger.exception("Worker %s failed", name)
+            done = 0
+
+        if not done:
+            await asyncio.sleep(idle_seconds)
+
+
+def start_task(name: str, coroutine: Coroutine):
+    task = asyncio.create_task(coroutine, name=name)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+def start_periodic(name: str, interval_seconds: float, job: Callable[[], Awaitable]):
+    start_task(name, _run_periodically(name, interval_seconds, job))
+
+
+def start_worker(name: str, idle_seconds: float, job: Callable[[], Awaitable[int]]):
+    start_task(name, _run_continuously(name, idle_seconds, job))
+
+
+async def stop_background_tasks():
+    for task in list(background_tasks):
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
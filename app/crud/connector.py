@@ -6,13 +6,35 @@ from uuid import UUID
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import insert, delete, update
-from sqlalchemy.orm import selectinload, InstrumentedAttribute
+from sqlalchemy import insert, delete, update, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.core.reference_cache import ReferenceCache
+from app.db.session import engine
+from app.utils.pagination import paginate, build_page
 
 
 class Connector:
-    def __init__(self, model):
+    def __init__(
+        self, model,
+        sort_keys: list[InstrumentedAttribute] | None = None,
+        cache: ReferenceCache | None = None,
+        cache_fields: list[InstrumentedAttribute] | None = None,
+    ):
         self.model = model
+        self.sort_keys = sort_keys if sort_keys is not None else [model.id]
+        # only unique fields may be cached; a hit on one returns the whole row
+        self.cache = cache
+        self.cache_fields = [field.key for field in cache_fields or [model.id]] if cache else []
+
+    async def _publish_change(self, session: AsyncSession):
+        if self.cache is not None:
+            await self.cache.publish(self.model, session)
+
+    def _invalidate(self):
+        if self.cache is not None:
+            self.cache.invalidate(self.model)
 
     async def write_to_db(
         self, data,
@@ -20,40 +42,75 @@ class Connector:
         commit: bool = True
     ):
         stmt = insert(self.model).values(data.model_dump()).returning(self.model)
-        result = await session.execute(stmt)
+        obj = (await session.execute(stmt)).scalar()
+        await self._publish_change(session)
 
         if commit:
             await session.commit()
-            await session.refresh(result)
 
-        return result.scalar()
+        self._invalidate()
+        return obj
 
-    async def get_objects(
+    async def get_page(
             self,
             session: AsyncSession,
-            offset: int = 0,
+            cursor: str | None = None,
             limit: int = 10,
             filters: list | None = None,
-    ):
-        stmt = select(self.model)
+            desc_: bool = False,
+            options: list | None = None,
+            columns: list | None = None,
+    ) -> dict:
+        # columns returns plain rows instead of entities; they must include the sort keys
+        stmt = select(*columns) if columns else select(self.model)
 
         if filters:
             stmt = stmt.where(*filters)
 
-        stmt = stmt.offset(offset).limit(limit)
-        return await session.scalars(stmt)
+        if options:
+            stmt = stmt.options(*options)
+
+        stmt = paginate(stmt, self.sort_keys, cursor, limit, desc_)
+        result = await session.execute(stmt)
+        items = result.all() if columns else result.scalars().all()
+        return build_page(items, self.sort_keys, limit)
+
+    async def get_objects_by_ids(
+        self, ids: list,
+        session: AsyncSession,
+        options: list | None = None
+    ) -> dict:
+        # one array parameter instead of an IN list, so the statement stays the same for any size
+        ids = list(dict.fromkeys(ids))
+        stmt = select(self.model).where(
+            self.model.id == any_(bindparam("ids", ids, type_=ARRAY(self.model.id.type)))
+        )
+
+        if options:
+            stmt = stmt.options(*options)
+
+        return {obj.id: obj for obj in await session.scalars(stmt)}
 
     async def get_object_by_unic_field(
         self, field_value,
         field: InstrumentedAttribute,
         session: AsyncSession,
-        selection_fields: list[InstrumentedAttribute] | None = None
+        options: list | None = None
     ):
         stmt = select(self.model).where(field == field_value)
 
-        if selection_fields is not None:
-            for s_field in selection_fields:
-                stmt = stmt.options(selectinload(s_field))
+        if options:
+            stmt = stmt.options(*options)
+        elif field.key in self.cache_fields:
+            values = self.cache.get(self.model, field.key, field_value)
+            if values is not None:
+                return await self.cache.load(self.model, values, session)
+
+            version = self.cache.version(self.model)
+            obj = await session.scalar(stmt)
+            if obj is not None:
+                self.cache.set(obj, version, self.cache_fields, from_replica=session.bind is not engine)
+            return obj
 
         return await session.scalar(stmt)
 
@@ -64,10 +121,12 @@ class Connector:
     ):
         values = new_values.model_dump(exclude_unset=True)
         stmt = update(self.model).where(self.model.id == object_id).values(values).returning(self.model)
-        result = await session.execute(stmt)
+        obj = (await session.execute(stmt)).scalar()
+        await self._publish_change(session)
         await session.commit()
 
-        return result.scalar()
+        self._invalidate()
+        return obj
 
     async def deactivate_object(
         self, object_id: UUID,
@@ -80,6 +139,8 @@ class Connector:
         )
 
         obj.is_active = False
+        await self._publish_change(session)
         await session.commit()
+        self._invalidate()
         await session.refresh(obj)
 
@@ -0,0 +1,100 @@
+import hashlib
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from decouple import config
+from pydantic import BaseModel
+from sqlalchemy import select, update, delete, values, column, tuple_, Integer, String, UUID as SA_UUID
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.connector import Connector
+from app.db.models import IdempotencyKey
+from app.db.session import SessionLocal
+
+
+IDEMPOTENCY_KEY_TTL_HOURS = config("IDEMPOTENCY_KEY_TTL_HOURS", default=24, cast=float)
+IDEMPOTENCY_CLEANUP_INTERVAL_MINUTES = config("IDEMPOTENCY_CLEANUP_INTERVAL_MINUTES", default=60, cast=float)
+
+KeyId = tuple[UUID, str]
+
+
+def request_hash(data: BaseModel) -> str:
+    return hashlib.sha256(data.model_dump_json(exclude={"created_by"}).encode()).hexdigest()
+
+
+class IdempotencyCRUD(Connector):
+    def __init__(self):
+        super().__init__(IdempotencyKey, sort_keys=[IdempotencyKey.user_id, IdempotencyKey.key])
+
+    async def claim(
+        self,
+        keys: list[tuple[UUID, str, str]],
+        session: AsyncSession,
+    ) -> set[KeyId]:
+        # blocks on a key another transaction is still holding, so a concurrent
+        # retry waits for the original and then sees it as already claimed
+        if not keys:
+            return set()
+
+        now = datetime.now()
+        stmt = insert(self.model).values([
+            {"user_id": user_id, "key": key, "request_hash": hash_, "created_at": now}
+            for user_id, key, hash_ in sorted(set(keys))
+        ]).on_conflict_do_nothing().returning(self.model.user_id, self.model.key)
+
+        return {(user_id, key) for user_id, key in await session.execute(stmt)}
+
+    async def get_stored(
+        self,
+        keys: list[KeyId],
+        session: AsyncSession,
+    ) -> dict[KeyId, IdempotencyKey]:
+        if not keys:
+            return {}
+
+        stmt = select(self.model).where(tuple_(self.model.user_id, self.model.key).in_(keys))
+        return {(row.user_id, row.key): row for row in await session.scalars(stmt)}
+
+    async def record(
+        self,
+        operation_ids: dict[KeyId, int],
+        session: AsyncSession,
+    ):
+        if not operation_ids:
+            return
+
+        results = values(
+            column("user_id", SA_UUID),
+            column("key", String),
+            column("operation_id", Integer),
+            name="results",
+        ).data([(user_id, key, operation_id) for (user_id, key), operation_id in operation_ids.items()])
+
+        stmt = update(self.model).where(
+            self.model.user_id == results.c.user_id,
+            self.model.key == results.c.key,
+        ).values(operation_id=results.c.operation_id).execution_options(synchronize_session=False)
+        await session.execute(stmt)
+
+    async def release(self, keys: list[KeyId], session: AsyncSession):
+        if keys:
+            await session.execute(
+                delete(self.model).where(tuple_(self.model.user_id, self.model.key).in_(keys))
+            )
+
+    async def purge_expired(self, session: AsyncSession, ttl: timedelta) -> int:
+        result = await session.execute(
+            delete(self.model).where(self.model.created_at < datetime.now() - ttl)
+        )
+        await session.commit()
+        return result.rowcount
+
+
+def get_idempotency_crud() -> IdempotencyCRUD:
+    return IdempotencyCRUD()
+
+
+async def purge_expired_idempotency_keys():
+    async with SessionLocal() as session:
+        await IdempotencyCRUD().purge_expired(session, timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS))
@@ -1,118 +1,516 @@
+from decimal import Decimal
+from typing import Awaitable, Callable, TypeVar
 from uuid import UUID
 
 import asyncio
+import logging
+import random
+from decouple import config, Csv
 from fastapi import Depends, HTTPException, status
-from sqlalchemy import desc, or_
+from sqlalchemy import insert, union_all
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 
+from app.core.batching import KeyedBatcher
+from app.core.metrics import HOT_STOCK_BATCH_SIZE
 from app.crud.connector import Connector
-from app.crud.stock import StockCRUD, get_stock_crud
+from app.crud.idempotency import IdempotencyCRUD, get_idempotency_crud, request_hash
+from app.crud.stock import StockCRUD, StockKey, get_stock_crud
+from app.crud.stock_summary import StockSummaryCRUD, get_stock_summary_crud
 from app.db.models import InventoryOperation, Warehouse
+from app.db.session import SessionLocal
+from app.utils.pagination import paginate, build_page
+from app.utils.operation_filters import OperationFilters
 from app.schemas.enums.enums import TransferType
-from app.schemas.rout_schemas.inventory_operations import InventoryOperationCreate
+from app.schemas.rules.inventory_operations import OPERATION_RULES
+from app.schemas.rout_schemas.inventory_operations import (
+    InventoryOperationCreate,
+    InventoryOperationBatchCreate,
+    InventoryOperationBatchResult,
+    InventoryOperationLineResult,
+)
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# products whose stock rows see enough concurrent writes that single operations
+# are queued per product and applied together in one short transaction
+HOT_SKU_PRODUCT_IDS = {UUID(value) for value in config("HOT_SKU_PRODUCT_IDS", default="", cast=Csv())}
+HOT_SKU_WINDOW_MS = config("HOT_SKU_WINDOW_MS", default=5, cast=float)
+HOT_SKU_MAX_BATCH = config("HOT_SKU_MAX_BATCH", default=500, cast=int)
+
+OPERATION_RETRY_ATTEMPTS = config("OPERATION_RETRY_ATTEMPTS", default=3, cast=int)
+OPERATION_RETRY_BASE_MS = config("OPERATION_RETRY_BASE_MS", default=10, cast=float)
+# serialization_failure, deadlock_detected
+RETRYABLE_SQLSTATES = {"40001", "40P01"}
+
+OPERATION_FAILED = "Operation could not be applied"
+STOCK_BUSY = "Stock is busy, try again"
+KEY_IN_USE = "Idempotency-Key is already in use"
+KEY_MISMATCH = "Idempotency-Key was used for a different request"
+REJECTION_STATUS = {
+    "Insufficient stock": status.HTTP_409_CONFLICT,
+    "Stock not found": status.HTTP_404_NOT_FOUND,
+    KEY_IN_USE: status.HTTP_409_CONFLICT,
+    KEY_MISMATCH: status.HTTP_422_UNPROCESSABLE_ENTITY,
+}
+
+
+def is_retryable(error: DBAPIError) -> bool:
+    return getattr(error.orig, "sqlstate", None) in RETRYABLE_SQLSTATES
+
+
+async def with_retries(attempt: Callable[[], Awaitable[T]], session: AsyncSession) -> T:
+    # runs the whole transaction again on serialization failures and deadlocks;
+    # other database errors are logged, their SQL and parameters stay server side
+    for retry in range(OPERATION_RETRY_ATTEMPTS):
+        try:
+            return await attempt()
+        except DBAPIError as e:
+            await session.rollback()
+            if not is_retryable(e):
+                logger.exception("Operation failed")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=OPERATION_FAILED
+                )
+
+        # full jitter keeps colliding requests from retrying in lockstep
+        await asyncio.sleep(random.uniform(0, OPERATION_RETRY_BASE_MS * 2 ** retry) / 1000)
+
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=STOCK_BUSY,
+    )
+
+
+def raise_for_rejection(result: InventoryOperationLineResult) -> InventoryOperationLineResult:
+    if not result.accepted:
+        raise HTTPException(status_code=REJECTION_STATUS[result.detail], detail=result.detail)
+
+    return result
+
+
+def stock_changes(
+    operation: InventoryOperationCreate | InventoryOperation
+) -> list[tuple[StockKey, Decimal, bool]]:
+    qty = Decimal(str(operation.quantity))
+    product_id = operation.product_id
+
+    match operation.type:
+        case TransferType.INBOUND.value:
+            return [((product_id, operation.to_warehouse_id), qty, False)]
+
+        case TransferType.OUTBOUND.value:
+            return [((product_id, operation.from_warehouse_id), -qty, False)]
+
+        case TransferType.TRANSFER.value:
+            return [
+                ((product_id, operation.from_warehouse_id), -qty, False),
+                ((product_id, operation.to_warehouse_id), qty, False),
+            ]
+
+        case TransferType.ADJUSTMENT.value:
+            return [((product_id, operation.from_warehouse_id), qty, True)]
+
+    return []
 
 
 class InventoryOperationsCRUD(Connector):
-    def __init__(self, stock_crud: StockCRUD):
-        super().__init__(InventoryOperation)
+    def __init__(
+        self,
+        stock_crud: StockCRUD,
+        stock_summary_crud: StockSummaryCRUD,
+        idempotency_crud: IdempotencyCRUD,
+    ):
+        super().__init__(
+            InventoryOperation,
+            sort_keys=[InventoryOperation.created_at, InventoryOperation.id],
+        )
+        # everything InventoryOperationsPublic needs, plus the sort keys
+        self.public_columns = [
+            InventoryOperation.id,
+            InventoryOperation.type,
+            InventoryOperation.product_id,
+            InventoryOperation.quantity,
+            InventoryOperation.created_by,
+            InventoryOperation.from_warehouse_id,
+            InventoryOperation.to_warehouse_id,
+            InventoryOperation.comment,
+            InventoryOperation.created_at,
+        ]
         self.stock_crud: StockCRUD = stock_crud
+        self.stock_summary_crud: StockSummaryCRUD = stock_summary_crud
+        self.idempotency_crud: IdempotencyCRUD = idempotency_crud
 
     async def create_operation(
         self,
         data: InventoryOperationCreate,
         user_id: UUID,
-        session: AsyncSession
+        session: AsyncSession,
+        idempotency_key: str | None = None,
     ):
         data = InventoryOperationCreate(
             **data.model_dump(exclude={"created_by"}),
             created_by=user_id
         )
 
-        operation = await self.write_to_db(data, session, commit=False)
+        if data.product_id in HOT_SKU_PRODUCT_IDS:
+            # the queued batch needs a pooled connection of its own; holding this
+            # one while waiting lets a burst of hot requests drain the pool
+            await session.close()
+            return await self._create_hot_operation(data, idempotency_key)
+
+        async def attempt():
+            if idempotency_key is not None:
+                settled = await self._settle_idempotency_keys([data], [idempotency_key], session)
+                if settled:
+                    # a replay never touches stock
+                    await session.rollback()
+                    return raise_for_rejection(settled[0])
+
+            operation = await self.write_to_db(data, session, commit=False)
+            deltas = await self._apply_stock_changes(operation, session)
+            await self.stock_summary_crud.apply_deltas(deltas, session)
+            await self.stock_crud.publish_changes({key: operation.id for key in deltas}, session)
+
+            if idempotency_key is not None:
+                await self.idempotency_crud.record({(user_id, idempotency_key): operation.id}, session)
+
+            await session.commit()
+            return operation
+
         try:
-            await self._apply_stock_changes(operation, session)
+            return await with_retries(attempt, session)
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT, detail="Insufficient stock"
             )
-        except Exception as e:
+        except LookupError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Stock not found"
+            )
+
+    async def _create_hot_operation(
+        self,
+        data: InventoryOperationCreate,
+        idempotency_key: str | None = None,
+    ) -> InventoryOperationLineResult:
+        try:
+            result = await hot_stock_batcher.submit(data.product_id, (data, idempotency_key))
+        except HTTPException as e:
+            # every request in the batch gets the same exception; each raises its own copy
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        except Exception:
+            logger.exception("Hot stock batch failed")
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail=f"{e}"
+                status_code=status.HTTP_400_BAD_REQUEST, detail=OPERATION_FAILED
             )
 
-        await session.commit()
-        return operation
+        return raise_for_rejection(result)
+
+    async def create_operations_batch(
+        self,
+        data: InventoryOperationBatchCreate,
+        user_id: UUID,
+        session: AsyncSession
+    ) -> InventoryOperationBatchResult:
+        operations = [
+            operation.model_copy(update={"created_by": user_id})
+            for operation in data.operations
+        ]
+
+        async def attempt():
+            results = await self._apply_batch(operations, session)
+            await session.commit()
+            return results
+
+        results = await with_retries(attempt, session)
+
+        accepted = sum(result.accepted for result in results)
+        return InventoryOperationBatchResult(
+            accepted=accepted,
+            rejected=len(results) - accepted,
+            results=results,
+        )
+
+    async def _apply_batch(
+        self,
+        operations: list[InventoryOperationCreate],
+        session: AsyncSession,
+        idempotency_keys: list[str | None] | None = None,
+    ) -> list[InventoryOperationLineResult]:
+        idempotency_keys = idempotency_keys or []
+        settled = await self._settle_idempotency_keys(operations, idempotency_keys, session)
+
+        changes = [stock_changes(operation) for operation in operations]
+        locked = await self.stock_crud.lock_stocks(
+            {key for index, line in enumerate(changes) if index not in settled for key, _, _ in line},
+            session,
+        )
+
+        balances = dict(locked)
+        results = []
+        accepted = []
+
+        for index, line in enumerate(changes):
+            if index in settled:
+                results.append(settled[index])
+                continue
+
+            pending = {}
+            detail = None
+
+            for key, qty, absolute in line:
+                if key not in balances:
+                    detail = "Stock not found"
+                    break
+
+                new_qty = qty if absolute else pending.get(key, balances[key]) + qty
+                if new_qty < 0:
+                    detail = "Insufficient stock"
+                    break
+
+                pending[key] = new_qty
+
+            if detail is None:
+                balances.update(pending)
+                accepted.append(index)
+
+            results.append(
+                InventoryOperationLineResult(index=index, accepted=detail is None, detail=detail)
+            )
+
+        deltas = {key: qty - locked[key] for key, qty in balances.items()}
+        await self.stock_crud.apply_deltas(deltas, session)
+        await self.stock_summary_crud.apply_deltas(deltas, session)
+
+        if accepted:
+            stmt = insert(self.model).returning(self.model.id, sort_by_parameter_order=True)
+            result = await session.execute(
+                stmt, [operations[index].model_dump() for index in accepted]
+            )
+
+            for index, operation_id in zip(accepted, result.scalars()):
+                results[index].id = operation_id
+
+            # each key reports the last operation that moved it in this batch
+            await self.stock_crud.publish_changes(
+                {key: results[index].id for index in accepted for key, _, _ in changes[index]},
+                session,
+            )
+
+        claimed = {
+            index: (operations[index].created_by, key)
+            for index, key in enumerate(idempotency_keys)
+            if key is not None and index not in settled
+        }
+        await self.idempotency_crud.record(
+            {key_id: results[index].id for index, key_id in claimed.items() if results[index].accepted},
+            session,
+        )
+        # rejected lines give their key back so a retry is evaluated again
+        await self.idempotency_crud.release(
+            [key_id for index, key_id in claimed.items() if not results[index].accepted],
+            session,
+        )
+
+        return results
+
+    async def _settle_idempotency_keys(
+        self,
+        operations: list[InventoryOperationCreate],
+        idempotency_keys: list[str | None],
+        session: AsyncSession
+    ) -> dict[int, InventoryOperationLineResult]:
+        # claims every key up front; lines whose key was already taken are
+        # answered here from the stored result and skip the stock update
+        keyed = {
+            index: (operations[index].created_by, key)
+            for index, key in enumerate(idempotency_keys)
+            if key is not None
+        }
+        if not keyed:
+            return {}
+
+        hashes = {index: request_hash(operations[index]) for index in keyed}
+        claimed = await self.idempotency_crud.claim(
+            [(*key_id, hashes[index]) for index, key_id in keyed.items()], session
+        )
+        stored = await self.idempotency_crud.get_stored(
+            list({key_id for key_id in keyed.values() if key_id not in claimed}), session
+        )
+
+        settled = {}
+        owners = set()
+        for index, key_id in keyed.items():
+            if key_id in claimed and key_id not in owners:
+                owners.add(key_id)
+                continue
+
+            previous = stored.get(key_id)
+            if previous is None or previous.operation_id is None:
+                settled[index] = InventoryOperationLineResult(index=index, accepted=False, detail=KEY_IN_USE)
+            elif previous.request_hash != hashes[index]:
+                settled[index] = InventoryOperationLineResult(index=index, accepted=False, detail=KEY_MISMATCH)
+            else:
+                settled[index] = InventoryOperationLineResult(
+                    index=index, accepted=True, id=previous.operation_id, replayed=True
+                )
+
+        return settled
 
     async def _apply_stock_changes(
         self,
         operation: InventoryOperation,
         session: AsyncSession
-    ):
+    ) -> dict[StockKey, Decimal]:
         qty = operation.quantity
+        product_id = operation.product_id
 
         match operation.type:
             case TransferType.INBOUND.value:
                 await self.stock_crud.increase(
-                    product_id=operation.product_id,
+                    product_id=product_id,
                     warehouse_id=operation.to_warehouse_id,
                     quantity=qty,
                     session=session,
                 )
+                return {(product_id, operation.to_warehouse_id): qty}
 
             case TransferType.OUTBOUND.value:
                 await self.stock_crud.decrease(
-                    product_id=operation.product_id,
+                    product_id=product_id,
                     warehouse_id=operation.from_warehouse_id,
                     quantity=qty,
                     session=session,
                 )
+                return {(product_id, operation.from_warehouse_id): -qty}
 
             case TransferType.TRANSFER.value:
-                await self.stock_crud.decrease(
-                    operation.product_id,
-                    operation.from_warehouse_id,
-                    qty,
-                    session=session,
-                )
-                await self.stock_crud.increase(
-                    operation.product_id,
-                    operation.to_warehouse_id,
-                    qty,
-                    session=session,
-                )
+                source = (product_id, operation.from_warehouse_id)
+                target = (product_id, operation.to_warehouse_id)
+
+                # both rows in one statement, ordered by key, so opposite
+                # transfers queue behind each other instead of deadlocking
+                locked = await self.stock_crud.lock_stocks({source, target}, session)
+                if source not in locked or target not in locked:
+                    raise LookupError("Stock not found")
+                if locked[source] < qty:
+                    raise ValueError("Insufficient stock")
+
+                deltas = {source: -qty, target: qty}
+                await self.stock_crud.apply_deltas(deltas, session)
+                return deltas
 
             case TransferType.ADJUSTMENT.value:
-                await self.stock_crud.adjust(
-                    operation.product_id,
+                key = (product_id, operation.from_warehouse_id)
+                previous = (await self.stock_crud.lock_stocks({key}, session)).get(key)
+                new_quantity = await self.stock_crud.adjust(
+                    product_id,
                     operation.from_warehouse_id,
                     qty,
                     session=session,
                 )
+                return {key: new_quantity - previous}
+
+        return {}
+
+    def _warehouse_columns(self, types: frozenset[str] | None) -> list:
+        # a type set can rule out a whole direction, e.g. outbound never has a to_warehouse_id
+        return [
+            column
+            for column in (self.model.from_warehouse_id, self.model.to_warehouse_id)
+            if types is None or any(column.key in OPERATION_RULES[type_].required for type_ in types)
+        ]
 
     async def get_warehouse_operations(
         self, warehouse: Warehouse,
         session: AsyncSession,
-        offset: int = 0,
+        cursor: str | None = None,
         limit: int = 10,
-        desc_: bool = False
-    ):
-        stmt = select(self.model).filter(
-            or_(
-                self.model.from_warehouse_id == warehouse.id,
-                self.model.to_warehouse_id == warehouse.id
-            )
+        desc_: bool = False,
+        filters: OperationFilters | None = None,
+    ) -> dict:
+        filters = filters or OperationFilters([])
+        columns = self._warehouse_columns(filters.types)
+
+        if not columns:
+            return build_page([], self.sort_keys, limit)
+
+        # one keyset range scan per direction, merged on the sort key; a created_at
+        # range in the filters also lets the planner skip whole monthly partitions
+        branches = [
+            paginate(
+                select(*self.public_columns).where(warehouse_column == warehouse.id, *filters.conditions),
+                self.sort_keys, cursor, limit, desc_
+            ).subquery()
+            for warehouse_column in columns
+        ]
+        operations = union_all(*(select(branch) for branch in branches)).subquery()
+
+        stmt = paginate(
+            select(operations),
+            [operations.c.created_at, operations.c.id],
+            limit=limit,
+            descending=desc_,
         )
+        items = (await session.execute(stmt)).all()
+        return build_page(items, self.sort_keys, limit)
+
+    def warehouse_operations_export_query(self, warehouse_id: UUID, filters: OperationFilters | None = None):
+        filters = filters or OperationFilters([])
+        table = self.model.__table__
+        # with no matching direction the single branch below just comes back empty
+        columns = self._warehouse_columns(filters.types) or [self.model.from_warehouse_id]
+        operations = union_all(*(
+            select(*table.c).where(warehouse_column == warehouse_id, *filters.conditions)
+            for warehouse_column in columns
+        )).subquery()
+
+        # both branches come ordered from their indexes, so this is a merge, not a sort
+        return select(operations).order_by(operations.c.created_at)
+
+
+async def _apply_hot_batch(
+    items: list[tuple[InventoryOperationCreate, str | None]]
+) -> list[InventoryOperationLineResult]:
+    operations, idempotency_keys = (list(column) for column in zip(*items))
+
+    # runs outside any request, so it gets its own session and commits on its own
+    async with SessionLocal() as session:
+        crud = InventoryOperationsCRUD(
+            stock_crud=StockCRUD(),
+            stock_summary_crud=StockSummaryCRUD(),
+            idempotency_crud=IdempotencyCRUD(),
+        )
+
+        async def attempt():
+            results = await crud._apply_batch(operations, session, idempotency_keys)
+            await session.commit()
+            return results
+
+        return await with_retries(attempt, session)
 
-        if desc_:
-            stmt = stmt.order_by(desc(self.model.created_at))
 
-        stmt = stmt.offset(offset).limit(limit)
-        return await session.scalars(stmt)
+hot_stock_batcher = KeyedBatcher(
+    _apply_hot_batch,
+    window=HOT_SKU_WINDOW_MS / 1000,
+    max_batch=HOT_SKU_MAX_BATCH,
+    on_flush=lambda size: HOT_STOCK_BATCH_SIZE.observe({}, size),
+)
 
 
 def get_inventory_operations_crud(
     stock_crud: StockCRUD = Depends(get_stock_crud),
+    stock_summary_crud: StockSummaryCRUD = Depends(get_stock_summary_crud),
+    idempotency_crud: IdempotencyCRUD = Depends(get_idempotency_crud),
 ) -> InventoryOperationsCRUD:
-    return InventoryOperationsCRUD(stock_crud=stock_crud)
+    return InventoryOperationsCRUD(
+        stock_crud=stock_crud,
+        stock_summary_crud=stock_summary_crud,
+        idempotency_crud=idempotency_crud,
+    )
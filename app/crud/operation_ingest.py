@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from decouple import config
+from fastapi import HTTPException, status
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.connector import Connector
+from app.crud.idempotency import IdempotencyCRUD
+from app.crud.inventory_oprations import InventoryOperationsCRUD, KEY_MISMATCH, is_retryable
+from app.crud.stock import StockCRUD
+from app.crud.stock_summary import StockSummaryCRUD
+from app.db.models import OperationIngest
+from app.db.session import SessionLocal
+from app.schemas.enums.enums import IngestStatus
+from app.schemas.rout_schemas.inventory_operations import InventoryOperationCreate
+
+
+# off by default: no pollers run and POST /operations/async answers 503
+OPERATION_INGEST_ENABLED = config("OPERATION_INGEST_ENABLED", default=False, cast=bool)
+OPERATION_INGEST_WORKERS = config("OPERATION_INGEST_WORKERS", default=2, cast=int)
+OPERATION_INGEST_BATCH_SIZE = config("OPERATION_INGEST_BATCH_SIZE", default=500, cast=int)
+OPERATION_INGEST_POLL_MS = config("OPERATION_INGEST_POLL_MS", default=200, cast=float)
+OPERATION_INGEST_RETENTION_HOURS = config("OPERATION_INGEST_RETENTION_HOURS", default=72, cast=float)
+OPERATION_INGEST_CLEANUP_INTERVAL_MINUTES = config(
+    "OPERATION_INGEST_CLEANUP_INTERVAL_MINUTES", default=60, cast=float
+)
+
+
+class OperationIngestCRUD(Connector):
+    def __init__(self):
+        super().__init__(OperationIngest, sort_keys=[OperationIngest.enqueued_at, OperationIngest.id])
+
+    async def enqueue(
+        self,
+        data: InventoryOperationCreate,
+        user_id: UUID,
+        session: AsyncSession,
+        idempotency_key: str | None = None,
+    ) -> OperationIngest:
+        payload = data.model_copy(update={"created_by": user_id}).model_dump(mode="json")
+
+        stmt = insert(self.model).values(
+            payload=payload,
+            created_by=user_id,
+            idempotency_key=idempotency_key,
+        ).on_conflict_do_nothing(
+            index_elements=[self.model.created_by, self.model.idempotency_key],
+            index_where=self.model.idempotency_key.isnot(None),
+        ).returning(self.model)
+        ticket = (await session.execute(stmt)).scalar()
+
+        if ticket is None:
+            # the same key was enqueued before: hand back the original ticket
+            ticket = await session.scalar(select(self.model).where(
+                self.model.created_by == user_id,
+                self.model.idempotency_key == idempotency_key,
+            ))
+
+            if ticket.payload != payload:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=KEY_MISMATCH
+                )
+
+        await session.commit()
+        return ticket
+
+    async def drain(self, operations_crud: InventoryOperationsCRUD, limit: int) -> int:
+        async with SessionLocal() as session:
+            # SKIP LOCKED lets every worker take a disjoint slice of the queue
+            tickets = (await session.scalars(
+                select(self.model)
+                .where(self.model.status == IngestStatus.pending.value)
+                .order_by(self.model.enqueued_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )).all()
+
+            if not tickets:
+                return 0
+
+            ticket_ids = [ticket.id for ticket in tickets]
+            try:
+                await self._apply(tickets, operations_crud, session)
+                await session.commit()
+                return len(ticket_ids)
+            except Exception as e:
+                await session.rollback()
+                if isinstance(e, DBAPIError) and is_retryable(e):
+                    return 0
+
+        # one bad line fails the whole batch; isolate it so the rest still go through
+        for ticket_id in ticket_ids:
+            await self._drain_one(ticket_id, operations_crud)
+
+        return len(ticket_ids)
+
+    async def _drain_one(self, ticket_id: UUID, operations_crud: InventoryOperationsCRUD):
+        async with SessionLocal() as session:
+            ticket = await session.scalar(
+                select(self.model)
+                .where(self.model.id == ticket_id, self.model.status == IngestStatus.pending.value)
+                .with_for_update(skip_locked=True)
+            )
+
+            if ticket is None:
+                return
+
+            try:
+                await self._apply([ticket], operations_crud, session)
+                await session.commit()
+                return
+            except Exception as e:
+                await session.rollback()
+                if isinstance(e, DBAPIError) and is_retryable(e):
+                    return
+                detail = f"{e}"
+
+            await session.execute(
+                update(self.model).where(self.model.id == ticket_id).values(
+                    status=IngestStatus.failed.value,
+                    detail=detail,
+                    processed_at=datetime.now(),
+                )
+            )
+            await session.commit()
+
+    async def _apply(
+        self,
+        tickets: list[OperationIngest],
+        operations_crud: InventoryOperationsCRUD,
+        session: AsyncSession
+    ):
+        # _apply_batch locks and updates each stock key once for the whole batch,
+        # applying the lines of a key in the order they were enqueued
+        results = await operations_crud._apply_batch(
+            [InventoryOperationCreate.model_validate(ticket.payload) for ticket in tickets],
+            session,
+            [ticket.idempotency_key for ticket in tickets],
+        )
+
+        processed_at = datetime.now()
+        for ticket, result in zip(tickets, results):
+            ticket.status = (IngestStatus.applied if result.accepted else IngestStatus.rejected).value
+            ticket.operation_id = result.id
+            ticket.detail = result.detail
+            ticket.processed_at = processed_at
+
+    async def purge_processed(self, session: AsyncSession, retention: timedelta) -> int:
+        result = await session.execute(delete(self.model).where(
+            self.model.status != IngestStatus.pending.value,
+            self.model.processed_at < datetime.now() - retention,
+        ))
+        await session.commit()
+        return result.rowcount
+
+
+def get_operation_ingest_crud() -> OperationIngestCRUD:
+    return OperationIngestCRUD()
+
+
+async def drain_operation_ingest() -> int:
+    operations_crud = InventoryOperationsCRUD(
+        stock_crud=StockCRUD(),
+        stock_summary_crud=StockSummaryCRUD(),
+        idempotency_crud=IdempotencyCRUD(),
+    )
+    return await OperationIngestCRUD().drain(operations_crud, OPERATION_INGEST_BATCH_SIZE)
+
+
+async def purge_processed_operation_ingest():
+    async with SessionLocal() as session:
+        await OperationIngestCRUD().purge_processed(
+            session, timedelta(hours=OPERATION_INGEST_RETENTION_HOURS)
+        )
@@ -0,0 +1,197 @@
+import asyncio
+import gzip
+import logging
+import os
+import re
+from datetime import date
+
+from decouple import config
+from sqlalchemy import select, func, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.connector import Connector
+from app.db.models import InventoryOperation
+from app.db.session import SessionLocal
+
+
+logger = logging.getLogger(__name__)
+
+OPERATION_PARTITION_MONTHS_AHEAD = config("OPERATION_PARTITION_MONTHS_AHEAD", default=3, cast=int)
+OPERATION_PARTITION_INTERVAL_HOURS = config("OPERATION_PARTITION_INTERVAL_HOURS", default=24, cast=float)
+# 0 keeps every partition attached
+OPERATION_RETENTION_MONTHS = config("OPERATION_RETENTION_MONTHS", default=0, cast=int)
+OPERATION_ARCHIVE_DIR = config("OPERATION_ARCHIVE_DIR", default="archive/operations")
+OPERATION_ARCHIVE_LOCK_TIMEOUT_MS = config("OPERATION_ARCHIVE_LOCK_TIMEOUT_MS", default=2000, cast=int)
+
+PARTITION_LOCK_ID = 7_301_002
+# lock_not_available, raised when lock_timeout fires
+LOCK_NOT_AVAILABLE = "55P03"
+PARENT_TABLE = InventoryOperation.__tablename__
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+
+PARTITION_NAME = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month:%Y_%m}"
+
+
+class OperationPartitionsCRUD(Connector):
+    def __init__(self):
+        super().__init__(InventoryOperation)
+
+    async def get_partitions(self, session: AsyncSession) -> dict[date, str]:
+        # the default partition does not match the monthly name and is left out
+        result = await session.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        ), {"parent": PARENT_TABLE})
+
+        partitions = {}
+        for (name,) in result:
+            match = PARTITION_NAME.match(name)
+            if match:
+                partitions[date(int(match[1]), int(match[2]), 1)] = name
+        return partitions
+
+    async def ensure_partitions(self, session: AsyncSession, months_ahead: int) -> list[str]:
+        # every worker runs this; the lock keeps them from racing on the DDL
+        if not await session.scalar(select(func.pg_try_advisory_xact_lock(PARTITION_LOCK_ID))):
+            return []
+
+        existing = await self.get_partitions(session)
+        current = date.today().replace(day=1)
+        created = []
+
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month in existing:
+                continue
+
+            name = partition_name(month)
+            bounds = f"created_at >= '{month}' AND created_at < '{add_months(month, 1)}'"
+            # rows of this month already in the default partition would make the
+            # CREATE fail; park them in a temp table and route them back afterwards
+            moved = await session.scalar(text(
+                f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {bounds})"
+            ))
+            if moved:
+                await session.execute(text(
+                    f"CREATE TEMP TABLE {name}_moved (LIKE {PARENT_TABLE}) ON COMMIT DROP"
+                ))
+                await session.execute(text(
+                    f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {bounds} RETURNING *) "
+                    f"INSERT INTO {name}_moved SELECT * FROM moved"
+                ))
+
+            await session.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+                f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            ))
+
+            if moved:
+                await session.execute(text(f"INSERT INTO {PARENT_TABLE} SELECT * FROM {name}_moved"))
+            created.append(name)
+
+        await session.commit()
+        return created
+
+    async def archive_partitions(
+        self,
+        session: AsyncSession,
+        retention_months: int,
+        archive_dir: str,
+    ) -> list[str]:
+        # every month older than the retention window is written out as gzipped
+        # CSV and dropped, one transaction per partition. The partition the
+        # migration made of the old ledger holds all history up to its month
+        # and goes once that month is out of the window.
+        cutoff = add_months(date.today().replace(day=1), -retention_months)
+        os.makedirs(archive_dir, exist_ok=True)
+        archived = []
+
+        if await self._archive_default_rows(session, cutoff, archive_dir):
+            archived.append(DEFAULT_PARTITION)
+
+        for month, name in sorted((await self.get_partitions(session)).items()):
+            if month >= cutoff:
+                break
+
+            if not await session.scalar(select(func.pg_try_advisory_xact_lock(PARTITION_LOCK_ID))):
+                break
+
+            # the export reads the still attached partition and only blocks writes
+            # to that closed month; the parent is locked just for the detach at the end,
+            # and in the same transaction so no late row can miss the archive
+            await session.execute(text(f"LOCK TABLE {name} IN SHARE MODE"))
+            await self._export(f"SELECT * FROM {name}", os.path.join(archive_dir, f"{name}.csv.gz"), session)
+
+            # DETACH needs ACCESS EXCLUSIVE on the whole ledger; give up rather than
+            # queue every reader and writer behind it
+            await session.execute(text(f"SET LOCAL lock_timeout = {OPERATION_ARCHIVE_LOCK_TIMEOUT_MS}"))
+            try:
+                await session.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            except DBAPIError as e:
+                if getattr(e.orig, "sqlstate", None) != LOCK_NOT_AVAILABLE:
+                    raise
+                await session.rollback()
+                logger.warning("Could not lock %s to detach %s, retrying next run", PARENT_TABLE, name)
+                break
+
+            await session.execute(text(f"DROP TABLE {name}"))
+            await session.commit()
+            archived.append(name)
+
+        return archived
+
+    async def _archive_default_rows(self, session: AsyncSession, cutoff: date, archive_dir: str) -> bool:
+        # rows whose month had no partition yet sit in the default partition and
+        # are never dropped with one; the old ones are exported and deleted instead
+        if not await session.scalar(select(func.pg_try_advisory_xact_lock(PARTITION_LOCK_ID))):
+            return False
+
+        old = f"FROM {DEFAULT_PARTITION} WHERE created_at < '{cutoff}'"
+        await session.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN SHARE MODE"))
+        first, last = (await session.execute(text(f"SELECT min(id), max(id) {old}"))).one()
+        if first is None:
+            await session.commit()
+            return False
+
+        # named by the id range, so a rerun after a failed delete overwrites its own file
+        path = os.path.join(archive_dir, f"{DEFAULT_PARTITION}_{first}_{last}.csv.gz")
+        await self._export(f"SELECT * {old}", path, session)
+        await session.execute(text(f"DELETE {old}"))
+        await session.commit()
+        return True
+
+    async def _export(self, query: str, path: str, session: AsyncSession):
+        # COPY straight off the session's connection, inside the archive transaction;
+        # a rerun after a failed detach simply overwrites the file
+        connection = await (await session.connection()).get_raw_connection()
+        archive = await asyncio.to_thread(gzip.open, f"{path}.part", "wb")
+
+        async def write(chunk: bytes):
+            await asyncio.to_thread(archive.write, chunk)
+
+        try:
+            await connection.driver_connection.copy_from_query(query, output=write, format="csv", header=True)
+        finally:
+            await asyncio.to_thread(archive.close)
+
+        os.replace(f"{path}.part", path)
+
+
+async def maintain_operation_partitions():
+    crud = OperationPartitionsCRUD()
+
+    async with SessionLocal() as session:
+        await crud.ensure_partitions(session, OPERATION_PARTITION_MONTHS_AHEAD)
+
+        if OPERATION_RETENTION_MONTHS > 0:
+            await crud.archive_partitions(session, OPERATION_RETENTION_MONTHS, OPERATION_ARCHIVE_DIR)
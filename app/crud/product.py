@@ -1,7 +1,56 @@
+from decouple import config
+from fastapi import HTTPException, status
+from sqlalchemy import select, case, func, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.reference_cache import reference_cache
 from app.crud.connector import Connector
 from app.db.models import Product
 
 
+PRODUCT_SEARCH_TIMEOUT_MS = config("PRODUCT_SEARCH_TIMEOUT_MS", default=300, cast=int)
+# query_canceled, raised when statement_timeout fires
+QUERY_CANCELED = "57014"
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 class ProductCRUD(Connector):
     def __init__(self):
-        super().__init__(Product)
+        super().__init__(Product, cache=reference_cache, cache_fields=[Product.id, Product.name])
+
+    def search_query(self, query: str, limit: int = 20):
+        pattern = _escape_like(query)
+        # prefix hits on sku first, then on name, then everything else by closeness
+        rank = case(
+            (self.model.sku.ilike(f"{pattern}%", escape="\\"), 0),
+            (self.model.name.ilike(f"{pattern}%", escape="\\"), 1),
+            else_=2,
+        )
+
+        # a bare is_active (not IS true) so the planner can match the partial trigram indexes
+        return select(self.model).where(
+            self.model.is_active,
+            self.model.sku.ilike(f"%{pattern}%", escape="\\") | self.model.name.ilike(f"%{pattern}%", escape="\\"),
+        ).order_by(
+            rank,
+            func.greatest(func.similarity(self.model.sku, query), func.similarity(self.model.name, query)).desc(),
+            self.model.name,
+        ).limit(limit)
+
+    async def search(self, query: str, session: AsyncSession, limit: int = 20) -> list[Product]:
+        stmt = self.search_query(query, limit)
+
+        try:
+            await session.execute(text(f"SET LOCAL statement_timeout = {PRODUCT_SEARCH_TIMEOUT_MS}"))
+            return (await session.scalars(stmt)).all()
+        except DBAPIError as e:
+            if getattr(e.orig, "sqlstate", None) != QUERY_CANCELED:
+                raise
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Search took too long, try a more specific query"
+            )
@@ -1,64 +1,227 @@
+from datetime import datetime
+from decimal import Decimal
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import select, update, values, column, tuple_, func, cast, literal, exists, bindparam, Integer, Numeric, Text, UUID as SA_UUID
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.stock_feed import STOCK_EVENTS_NOTIFY, STOCK_EVENTS_CHANNEL
 from app.crud.connector import Connector
 from app.db.models import Stock
 
 
+BATCH_PAGE_SIZE = 1000
+
+StockKey = tuple[UUID, UUID]
+
+
 class StockCRUD(Connector):
     def __init__(self):
-        super().__init__(Stock)
+        super().__init__(Stock, sort_keys=[Stock.product_id, Stock.warehouse_id])
+
+    def export_query(self, filters: list | None = None):
+        stmt = select(
+            self.model.product_id,
+            self.model.warehouse_id,
+            self.model.quantity,
+            self.model.updated_at,
+        )
+
+        if filters:
+            stmt = stmt.where(*filters)
+
+        return stmt.order_by(*self.sort_keys)
+
+    async def lock_stocks(
+        self,
+        keys: set[StockKey],
+        session: AsyncSession,
+    ) -> dict[StockKey, Decimal]:
+        keys = sorted(key for key in keys if None not in key)
+        quantities = {}
+
+        for start in range(0, len(keys), BATCH_PAGE_SIZE):
+            stmt = select(
+                self.model.product_id, self.model.warehouse_id, self.model.quantity
+            ).where(
+                tuple_(self.model.product_id, self.model.warehouse_id).in_(
+                    keys[start:start + BATCH_PAGE_SIZE]
+                )
+            ).order_by(
+                self.model.product_id, self.model.warehouse_id
+            ).with_for_update()
+
+            result = await session.execute(stmt)
+            quantities.update(
+                {(product_id, warehouse_id): qty for product_id, warehouse_id, qty in result}
+            )
+
+        return quantities
+
+    async def apply_deltas(
+        self,
+        deltas: dict[StockKey, Decimal],
+        session: AsyncSession,
+    ):
+        rows = [
+            (product_id, warehouse_id, delta)
+            for (product_id, warehouse_id), delta in sorted(deltas.items())
+            if delta
+        ]
+
+        for start in range(0, len(rows), BATCH_PAGE_SIZE):
+            changes = values(
+                column("product_id", SA_UUID),
+                column("warehouse_id", SA_UUID),
+                column("delta", Numeric(10, 2)),
+                name="changes",
+            ).data(rows[start:start + BATCH_PAGE_SIZE])
+
+            stmt = update(self.model).where(
+                self.model.product_id == changes.c.product_id,
+                self.model.warehouse_id == changes.c.warehouse_id,
+            ).values(
+                quantity=self.model.quantity + changes.c.delta,
+                updated_at=datetime.now(),
+            ).execution_options(synchronize_session=False)
+            await session.execute(stmt)
 
-    async def get_stock(
+    async def publish_changes(
         self,
-        product_id: UUID,
-        warehouse_id: UUID,
+        operation_ids: dict[StockKey, int],
         session: AsyncSession,
     ):
-        stmt = select(self.model).where(
-            self.model.product_id == product_id,
-            self.model.warehouse_id == warehouse_id,
-        ).with_for_update()
+        # NOTIFY is queued with the transaction, so listeners only ever see
+        # committed quantities; they are read back here under the row locks
+        if not STOCK_EVENTS_NOTIFY or not operation_ids:
+            return
 
-        return await session.scalar(stmt)
+        rows = [
+            (product_id, warehouse_id, operation_id)
+            for (product_id, warehouse_id), operation_id in sorted(operation_ids.items())
+        ]
+
+        for start in range(0, len(rows), BATCH_PAGE_SIZE):
+            changes = values(
+                column("product_id", SA_UUID),
+                column("warehouse_id", SA_UUID),
+                column("operation_id", Integer),
+                name="changes",
+            ).data(rows[start:start + BATCH_PAGE_SIZE])
+
+            event = func.json_build_object(
+                literal("type"), literal("stock"),
+                literal("product_id"), self.model.product_id,
+                literal("warehouse_id"), self.model.warehouse_id,
+                literal("quantity"), self.model.quantity,
+                literal("operation_id"), changes.c.operation_id,
+            )
+            stmt = select(func.pg_notify(STOCK_EVENTS_CHANNEL, cast(event, Text))).where(
+                self.model.product_id == changes.c.product_id,
+                self.model.warehouse_id == changes.c.warehouse_id,
+            )
+            await session.execute(stmt)
+
+    async def get_stocks_by_keys(
+        self,
+        keys: list[StockKey],
+        session: AsyncSession,
+        options: list | None = None,
+    ) -> dict[StockKey, Stock]:
+        # two array parameters unnested side by side, so the statement stays the same for any size
+        keys = list(dict.fromkeys(keys))
+        requested = func.unnest(
+            bindparam("product_ids", [key[0] for key in keys], type_=ARRAY(SA_UUID)),
+            bindparam("warehouse_ids", [key[1] for key in keys], type_=ARRAY(SA_UUID)),
+        ).table_valued(column("product_id", SA_UUID), column("warehouse_id", SA_UUID)).render_derived()
+        stmt = select(self.model).join(
+            requested,
+            (self.model.product_id == requested.c.product_id)
+            & (self.model.warehouse_id == requested.c.warehouse_id),
+        )
+
+        if options:
+            stmt = stmt.options(*options)
+
+        return {(stock.product_id, stock.warehouse_id): stock for stock in await session.scalars(stmt)}
 
     async def increase(
             self,
             product_id: UUID,
             warehouse_id: UUID,
-            quantity: float,
+            quantity: Decimal,
             session: AsyncSession
-    ):
-        stock = await self.get_stock(product_id, warehouse_id, session)
-        print("Stock found")
-        stock.quantity += quantity
-        print(f"Stock increase on {quantity}")
+    ) -> Decimal:
+        return await self._update_quantity(
+            product_id, warehouse_id, self.model.quantity + quantity, session
+        )
 
     async def decrease(
             self,
             product_id: UUID,
             warehouse_id: UUID,
-            quantity: float,
+            quantity: Decimal,
             session: AsyncSession
-    ):
-        stock = await self.get_stock(product_id, warehouse_id, session)
+    ) -> Decimal:
+        new_quantity = await self._update_quantity(
+            product_id, warehouse_id, self.model.quantity - quantity, session,
+            self.model.quantity >= quantity,
+        )
 
-        if stock.quantity < quantity:
+        if new_quantity is None:
             raise ValueError("Insufficient stock")
 
-        stock.quantity -= quantity
+        return new_quantity
 
     async def adjust(
             self,
             product_id: UUID,
             warehouse_id: UUID,
-            quantity: float,
+            quantity: Decimal,
             session: AsyncSession
-    ):
-        stock = await self.get_stock(product_id, warehouse_id, session)
-        stock.quantity = quantity
+    ) -> Decimal:
+        return await self._update_quantity(
+            product_id, warehouse_id, quantity, session
+        )
+
+    async def _update_quantity(
+            self,
+            product_id: UUID,
+            warehouse_id: UUID,
+            quantity,
+            session: AsyncSession,
+            *conditions,
+    ) -> Decimal | None:
+        # None means a guard in `conditions` turned the change down; a missing
+        # stock row raises LookupError either way
+        key = (self.model.product_id == product_id, self.model.warehouse_id == warehouse_id)
+        stmt = update(self.model).where(
+            *key,
+            *conditions,
+        ).values(
+            quantity=quantity,
+            updated_at=datetime.now(),
+        ).returning(
+            self.model.quantity
+        ).execution_options(synchronize_session=False)
+
+        if not conditions:
+            new_quantity = await session.scalar(stmt)
+            found = new_quantity is not None
+        else:
+            # a failed guard and a missing row both leave RETURNING empty, so the
+            # same statement also reports whether the row is there
+            updated = stmt.cte("updated")
+            new_quantity, found = (await session.execute(select(
+                select(updated.c.quantity).scalar_subquery(),
+                exists().where(*key),
+            ))).one()
+
+        if not found:
+            raise LookupError("Stock not found")
+
+        return new_quantity
 
 
 def get_stock_crud() -> StockCRUD:
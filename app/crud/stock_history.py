@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import UUID
+
+from decouple import config
+from sqlalchemy import select, insert, delete, func, literal, or_, text, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.connector import Connector
+from app.crud.inventory_oprations import stock_changes
+from app.crud.stock import StockKey
+from app.db.models import Stock, StockSnapshot, StockSnapshotRun, InventoryOperation
+from app.db.session import SessionLocal
+
+
+SNAPSHOT_LOCK_ID = 7_301_001
+# upper bound on how long an operation can sit between taking its created_at
+# and committing; only used to give the replay scan a lower created_at bound
+REPLAY_MARGIN = timedelta(minutes=config("STOCK_SNAPSHOT_REPLAY_MARGIN_MINUTES", default=60, cast=int))
+STOCK_SNAPSHOT_INTERVAL_HOURS = config("STOCK_SNAPSHOT_INTERVAL_HOURS", default=0, cast=float)
+# 0 keeps every snapshot
+STOCK_SNAPSHOT_RETENTION_DAYS = config("STOCK_SNAPSHOT_RETENTION_DAYS", default=0, cast=float)
+
+
+class StockHistoryCRUD(Connector):
+    def __init__(self):
+        super().__init__(
+            StockSnapshot,
+            sort_keys=[StockSnapshot.taken_at, StockSnapshot.product_id, StockSnapshot.warehouse_id],
+        )
+
+    async def take_snapshot(
+        self,
+        session: AsyncSession,
+        min_interval: timedelta | None = None,
+    ) -> datetime | None:
+        if min_interval is not None:
+            latest = await session.scalar(select(func.max(StockSnapshotRun.taken_at)))
+            if latest is not None and datetime.now() - latest < min_interval:
+                return None
+
+        async with SessionLocal() as copy:
+            # the copy reads one repeatable read snapshot, pinned by its first statement
+            await copy.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+            # waits for in-flight operations and holds new ones, but only until the
+            # snapshot is pinned: every operation id up to last_operation_id is in it
+            await session.execute(text("LOCK TABLE inventory_operation, stock IN SHARE MODE"))
+            taken_at = datetime.now()
+            last_operation_id = await copy.scalar(select(func.coalesce(func.max(InventoryOperation.id), 0)))
+            await session.commit()
+
+            # one snapshot at a time across workers
+            if not await copy.scalar(select(func.pg_try_advisory_xact_lock(SNAPSHOT_LOCK_ID))):
+                return None
+
+            await copy.execute(
+                insert(StockSnapshotRun).values(taken_at=taken_at, last_operation_id=last_operation_id)
+            )
+            await copy.execute(insert(StockSnapshot).from_select(
+                ["taken_at", "product_id", "warehouse_id", "quantity"],
+                select(literal(taken_at, DateTime), Stock.product_id, Stock.warehouse_id, Stock.quantity),
+            ))
+            await copy.commit()
+
+        return taken_at
+
+    async def prune_snapshots(self, session: AsyncSession, keep: timedelta) -> int:
+        # the newest run before the cutoff stays, so as-of queries over the whole
+        # window still have a snapshot to replay from; the FK cascades to its rows
+        cutoff = select(func.max(StockSnapshotRun.taken_at)).where(
+            StockSnapshotRun.taken_at <= datetime.now() - keep
+        ).scalar_subquery()
+
+        result = await session.execute(delete(StockSnapshotRun).where(StockSnapshotRun.taken_at < cutoff))
+        await session.commit()
+        return result.rowcount
+
+    async def get_stock_as_of(
+        self,
+        at: datetime,
+        session: AsyncSession,
+        product_id: UUID | None = None,
+        warehouse_id: UUID | None = None,
+    ) -> dict[StockKey, Decimal] | None:
+        run = (await session.execute(
+            select(StockSnapshotRun).where(StockSnapshotRun.taken_at <= at)
+            .order_by(StockSnapshotRun.taken_at.desc()).limit(1)
+        )).scalar()
+
+        if run is None:
+            return None
+
+        snapshot = select(StockSnapshot.product_id, StockSnapshot.warehouse_id, StockSnapshot.quantity).where(
+            StockSnapshot.taken_at == run.taken_at
+        )
+        operations = select(
+            InventoryOperation.type,
+            InventoryOperation.quantity,
+            InventoryOperation.product_id,
+            InventoryOperation.from_warehouse_id,
+            InventoryOperation.to_warehouse_id,
+        ).where(
+            InventoryOperation.id > run.last_operation_id,
+            InventoryOperation.created_at >= run.taken_at - REPLAY_MARGIN,
+            InventoryOperation.created_at <= at,
+        ).order_by(InventoryOperation.created_at, InventoryOperation.id)
+
+        if product_id is not None:
+            snapshot = snapshot.where(StockSnapshot.product_id == product_id)
+            operations = operations.where(InventoryOperation.product_id == product_id)
+
+        if warehouse_id is not None:
+            snapshot = snapshot.where(StockSnapshot.warehouse_id == warehouse_id)
+            operations = operations.where(or_(
+                InventoryOperation.from_warehouse_id == warehouse_id,
+                InventoryOperation.to_warehouse_id == warehouse_id,
+            ))
+
+        quantities = {
+            (row.product_id, row.warehouse_id): row.quantity
+            for row in await session.execute(snapshot)
+        }
+
+        result = await session.stream(operations.execution_options(yield_per=1000))
+        async for operation in result:
+            for key, qty, absolute in stock_changes(operation):
+                if warehouse_id is not None and key[1] != warehouse_id:
+                    continue
+                quantities[key] = qty if absolute else quantities.get(key, Decimal(0)) + qty
+
+        return quantities
+
+
+def get_stock_history_crud() -> StockHistoryCRUD:
+    return StockHistoryCRUD()
+
+
+async def take_periodic_snapshot():
+    # every worker runs the timer; the interval check keeps it to one snapshot
+    crud = StockHistoryCRUD()
+
+    async with SessionLocal() as session:
+        await crud.take_snapshot(
+            session, min_interval=timedelta(hours=STOCK_SNAPSHOT_INTERVAL_HOURS / 2)
+        )
+
+        if STOCK_SNAPSHOT_RETENTION_DAYS > 0:
+            await crud.prune_snapshots(session, timedelta(days=STOCK_SNAPSHOT_RETENTION_DAYS))
@@ -0,0 +1,97 @@
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import select, update, delete, values, column, func, text, Numeric, UUID as SA_UUID
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.connector import Connector
+from app.crud.stock import StockKey
+from app.db.models import Stock, Warehouse, StockProductSummary
+
+
+class StockSummaryCRUD(Connector):
+    def __init__(self):
+        super().__init__(StockProductSummary, sort_keys=[StockProductSummary.product_id])
+
+    async def get_product_quantity(self, product_id: UUID, session: AsyncSession) -> Decimal:
+        quantity = await session.scalar(
+            select(StockProductSummary.quantity).where(StockProductSummary.product_id == product_id)
+        )
+        return quantity or Decimal(0)
+
+    async def get_warehouse_quantity(self, warehouse_id: UUID, session: AsyncSession) -> Decimal:
+        # summed on read from ix_stock_warehouse_id: a running total row per warehouse
+        # would be locked by every stock write there and serialize them all
+        quantity = await session.scalar(
+            select(func.sum(Stock.quantity)).where(Stock.warehouse_id == warehouse_id)
+        )
+        return quantity or Decimal(0)
+
+    async def apply_deltas(
+        self,
+        deltas: dict[StockKey, Decimal],
+        session: AsyncSession,
+    ):
+        rows = [
+            (product_id, warehouse_id, delta)
+            for (product_id, warehouse_id), delta in sorted(deltas.items())
+            if delta
+        ]
+
+        if not rows:
+            return
+
+        changes = values(
+            column("product_id", SA_UUID),
+            column("warehouse_id", SA_UUID),
+            column("delta", Numeric(10, 2)),
+            name="changes",
+        ).data(rows)
+
+        # product totals only count active warehouses
+        product_totals = select(
+            changes.c.product_id, func.sum(changes.c.delta)
+        ).join(
+            Warehouse, (Warehouse.id == changes.c.warehouse_id) & Warehouse.is_active
+        ).group_by(changes.c.product_id).order_by(changes.c.product_id)
+
+        stmt = insert(StockProductSummary).from_select(["product_id", "quantity"], product_totals)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["product_id"],
+            set_={"quantity": StockProductSummary.quantity + stmt.excluded.quantity},
+        )
+        await session.execute(stmt)
+
+    async def lock_stock(self, session: AsyncSession):
+        # SHARE mode waits for in-flight stock writes and holds new ones until
+        # commit, so no delta can land while the totals are being changed
+        await session.execute(text("LOCK TABLE stock IN SHARE MODE"))
+
+    async def remove_warehouse(self, warehouse_id: UUID, session: AsyncSession):
+        # the caller holds lock_stock, so no delta for this warehouse can land in between
+        totals = select(
+            Stock.product_id, func.sum(Stock.quantity).label("quantity")
+        ).where(Stock.warehouse_id == warehouse_id).group_by(Stock.product_id).subquery()
+
+        stmt = update(StockProductSummary).where(
+            StockProductSummary.product_id == totals.c.product_id
+        ).values(
+            quantity=StockProductSummary.quantity - totals.c.quantity
+        ).execution_options(synchronize_session=False)
+        await session.execute(stmt)
+
+    async def rebuild(self, session: AsyncSession):
+        await self.lock_stock(session)
+        await session.execute(delete(StockProductSummary))
+
+        await session.execute(insert(StockProductSummary).from_select(
+            ["product_id", "quantity"],
+            select(Stock.product_id, func.sum(Stock.quantity)).join(
+                Warehouse, (Warehouse.id == Stock.warehouse_id) & Warehouse.is_active
+            ).group_by(Stock.product_id),
+        ))
+
+
+def get_stock_summary_crud() -> StockSummaryCRUD:
+    return StockSummaryCRUD()
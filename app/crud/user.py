@@ -1,20 +1,20 @@
-from passlib.context import CryptContext
+from uuid import UUID
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from app.auth.cache import invalidate_user
+from app.auth.hashing import hash_password, verify_password
 from app.crud.connector import Connector
 from app.db.models import User
 
-password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 class UserCRUD(Connector):
     def __init__(self):
         super().__init__(User)
 
     async def write_to_db(self, data, session: AsyncSession):
-        hashed_password = password_context.hash(data.password)
+        hashed_password = await hash_password(data.password)
 
         db_user = User(
             firstname=data.firstname,
@@ -29,6 +29,13 @@ class UserCRUD(Connector):
 
         return db_user
 
+    async def deactivate_object(
+        self, object_id: UUID,
+        session: AsyncSession
+    ):
+        await super().deactivate_object(object_id, session)
+        invalidate_user(object_id)
+
     async def get_user_by_email(
             self,
             user_email: str,
@@ -42,4 +49,4 @@ class UserCRUD(Connector):
             password: str,
             hashed_password: str
   ):
-        return password_context.verify(password, hashed_password)
\ No newline at end of file
+        return await verify_password(password, hashed_password)
\ No newline at end of file
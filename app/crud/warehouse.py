@@ -1,17 +1,50 @@
 from typing import Optional
 from uuid import UUID
 
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status, Depends
 
+from app.core.reference_cache import reference_cache
 from app.crud.connector import Connector
 from app.crud.inventory_oprations import InventoryOperationsCRUD, get_inventory_operations_crud
+from app.crud.stock_summary import StockSummaryCRUD
 from app.db.models import Warehouse
+from app.utils.operation_filters import OperationFilters
 
 
 class WarehouseCRUD(Connector):
     def __init__(self):
-        super().__init__(Warehouse)
+        super().__init__(Warehouse, cache=reference_cache, cache_fields=[Warehouse.id, Warehouse.name])
+
+    async def deactivate_object(
+        self, object_id: UUID,
+        session: AsyncSession
+    ):
+        summary_crud = StockSummaryCRUD()
+        # the stock lock comes first: stock writers hold theirs while their operation
+        # INSERT checks the warehouse key, so the reverse order can deadlock with them
+        await summary_crud.lock_stock(session)
+
+        # the row lock makes a concurrent second call wait and then see is_active = false,
+        # so a warehouse's stock is only ever taken out of the product totals once; NO KEY
+        # UPDATE leaves the FK checks of concurrent operation inserts unblocked
+        is_active = await session.scalar(
+            select(Warehouse.is_active).where(Warehouse.id == object_id).with_for_update(key_share=True)
+        )
+
+        if is_active is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Warehouse not found"
+            )
+
+        if not is_active:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail="Warehouse isn't active"
+            )
+
+        await summary_crud.remove_warehouse(object_id, session)
+        await super().deactivate_object(object_id, session)
 
     async def get_operations_by_warehouse_id(
         self,
@@ -19,8 +52,9 @@ class WarehouseCRUD(Connector):
         session: AsyncSession,
         inventory_operation_crud: InventoryOperationsCRUD,
         desc: Optional[bool] = False,
-        offset: int = 0,
+        cursor: Optional[str] = None,
         limit: int = 10,
+        filters: Optional[OperationFilters] = None,
     ):
         warehouse = await self.get_object_by_unic_field(warehouse_id, Warehouse.id, session)
 
@@ -30,5 +64,5 @@ class WarehouseCRUD(Connector):
             )
 
         return await inventory_operation_crud.get_warehouse_operations(
-            warehouse, session, offset, limit, desc_=desc
+            warehouse, session, cursor, limit, desc_=desc, filters=filters
         )
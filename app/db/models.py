@@ -4,13 +4,17 @@ from uuid import UUID
 from datetime import datetime
 
 from sqlalchemy.orm import declarative_base, Mapped, mapped_column, relationship, validates
-from sqlalchemy import String, Integer, ForeignKey, Boolean, UUID, DateTime, Enum, Numeric, Text
+from sqlalchemy import String, Integer, ForeignKey, Boolean, UUID, DateTime, Enum, Numeric, Text, Index, text, DDL, event
+from sqlalchemy.dialects.postgresql import JSONB
 
-from app.schemas.enums.enums import UserRole
+from app.schemas.enums.enums import UserRole, IngestStatus
 
 
 Base = declarative_base()
 
+# trigram indexes on product need the extension before create_all builds them
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
 
 class User(Base):
     __tablename__ = 'user'
@@ -54,6 +58,18 @@ class Warehouse(Base):
 
 class Product(Base):
     __tablename__ = 'product'
+    __table_args__ = (
+        Index(
+            'ix_product_sku_trgm', 'sku',
+            postgresql_using='gin', postgresql_ops={'sku': 'gin_trgm_ops'},
+            postgresql_where=text('is_active'),
+        ),
+        Index(
+            'ix_product_name_trgm', 'name',
+            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_where=text('is_active'),
+        ),
+    )
 
     id: Mapped[UUID] = mapped_column(UUID, primary_key=True, default=uuid.uuid4)
     name: Mapped[str] = mapped_column(String(256), unique=True, nullable=False)
@@ -71,12 +87,15 @@ class Product(Base):
 
 class Stock(Base):
     __tablename__ = 'stock'
+    __table_args__ = (
+        Index('ix_stock_warehouse_id', 'warehouse_id'),
+    )
 
     product_id: Mapped[UUID] = mapped_column(UUID, ForeignKey('product.id'), primary_key=True)
-    product: Mapped[Product] = relationship("Product", back_populates="stocks", lazy="selectin")
+    product: Mapped[Product] = relationship("Product", back_populates="stocks")
 
     warehouse_id: Mapped[UUID] = mapped_column(UUID, ForeignKey('warehouse.id'), primary_key=True)
-    warehouse: Mapped[Warehouse] = relationship("Warehouse", back_populates="stocks", lazy="selectin")
+    warehouse: Mapped[Warehouse] = relationship("Warehouse", back_populates="stocks")
 
     quantity: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
@@ -88,15 +107,53 @@ class Stock(Base):
         return value
 
 
+class StockProductSummary(Base):
+    __tablename__ = 'stock_product_summary'
+
+    product_id: Mapped[UUID] = mapped_column(UUID, ForeignKey('product.id'), primary_key=True)
+    quantity: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+
+
+class StockSnapshotRun(Base):
+    __tablename__ = 'stock_snapshot_run'
+
+    taken_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    last_operation_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class StockSnapshot(Base):
+    __tablename__ = 'stock_snapshot'
+
+    taken_at: Mapped[datetime] = mapped_column(
+        DateTime, ForeignKey('stock_snapshot_run.taken_at', ondelete='CASCADE'), primary_key=True
+    )
+    product_id: Mapped[UUID] = mapped_column(UUID, primary_key=True)
+    warehouse_id: Mapped[UUID] = mapped_column(UUID, primary_key=True)
+    quantity: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
+
+
 class InventoryOperation(Base):
     __tablename__ = 'inventory_operation'
+    __table_args__ = (
+        Index('ix_inventory_operation_from_warehouse_id_created_at', 'from_warehouse_id', 'created_at'),
+        Index('ix_inventory_operation_to_warehouse_id_created_at', 'to_warehouse_id', 'created_at'),
+        Index('ix_inventory_operation_product_id_created_at', 'product_id', 'created_at'),
+        Index('ix_inventory_operation_created_at', 'created_at'),
+        Index('ix_inventory_operation_from_warehouse_id_product_id_created_at', 'from_warehouse_id', 'product_id', 'created_at'),
+        Index('ix_inventory_operation_to_warehouse_id_product_id_created_at', 'to_warehouse_id', 'product_id', 'created_at'),
+        Index('ix_inventory_operation_from_warehouse_id_created_by_created_at', 'from_warehouse_id', 'created_by', 'created_at'),
+        Index('ix_inventory_operation_to_warehouse_id_created_by_created_at', 'to_warehouse_id', 'created_by', 'created_at'),
+        # monthly partitions are managed by app.crud.operation_partitions
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # the partition key has to be part of the primary key
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     type: Mapped[str] = mapped_column(String(20))
     quantity: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False)
 
     product_id: Mapped[UUID] = mapped_column(UUID, ForeignKey('product.id'))
-    product: Mapped[Product] = relationship("Product", back_populates="operations", lazy="selectin")
+    product: Mapped[Product] = relationship("Product", back_populates="operations")
 
     from_warehouse_id: Mapped[UUID] = mapped_column(UUID, ForeignKey('warehouse.id'), nullable=True)
     from_warehouse: Mapped[Warehouse] = relationship(
@@ -112,8 +169,54 @@ class InventoryOperation(Base):
         back_populates="incoming_movements"
     )
 
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    created_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True, default=datetime.now)
     created_by: Mapped[UUID] = mapped_column(UUID, ForeignKey('user.id'))
-    creator: Mapped[User] = relationship("User", back_populates="operations", lazy="selectin")
+    creator: Mapped[User] = relationship("User", back_populates="operations")
 
     comment: Mapped[str] = mapped_column(Text, nullable=True)
+
+
+# catches rows outside every monthly partition instead of failing the insert
+event.listen(
+    InventoryOperation.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS inventory_operation_default PARTITION OF inventory_operation DEFAULT"),
+)
+
+
+class IdempotencyKey(Base):
+    __tablename__ = 'idempotency_key'
+    __table_args__ = (
+        Index('ix_idempotency_key_created_at', 'created_at'),
+    )
+
+    user_id: Mapped[UUID] = mapped_column(UUID, primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    # no FK: keys are purged on their own schedule, independent of the ledger
+    operation_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+
+class OperationIngest(Base):
+    __tablename__ = 'operation_ingest'
+    __table_args__ = (
+        Index(
+            'ix_operation_ingest_pending', 'enqueued_at',
+            postgresql_where=text("status = 'pending'"),
+        ),
+        Index(
+            'uq_operation_ingest_idempotency_key', 'created_by', 'idempotency_key',
+            unique=True, postgresql_where=text("idempotency_key IS NOT NULL"),
+        ),
+    )
+
+    id: Mapped[UUID] = mapped_column(UUID, primary_key=True, default=uuid.uuid4)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    created_by: Mapped[UUID] = mapped_column(UUID, nullable=False)
+    idempotency_key: Mapped[str] = mapped_column(String(255), nullable=True)
+    status: Mapped[str] = mapped_column(String(20), default=IngestStatus.pending.value)
+    operation_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    detail: Mapped[str] = mapped_column(Text, nullable=True)
+    enqueued_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    processed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
@@ -1,9 +1,113 @@
+import time
+from uuid import uuid4
+
 from decouple import config
+from fastapi import Request, Response
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import DB_POOL_OVERFLOW_CONNECTIONS, DB_POOL_WAIT, instrument_engine
+
+
+DB_POOL_SIZE = config('DB_POOL_SIZE', default=5, cast=int)
+DB_MAX_OVERFLOW = config('DB_MAX_OVERFLOW', default=10, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=30, cast=float)
+DB_POOL_RECYCLE = config('DB_POOL_RECYCLE', default=1800, cast=int)
+DB_POOL_PRE_PING = config('DB_POOL_PRE_PING', default=True, cast=bool)
+DB_STATEMENT_CACHE_SIZE = config('DB_STATEMENT_CACHE_SIZE', default=100, cast=int)
+DB_PREPARED_STATEMENT_CACHE_SIZE = config('DB_PREPARED_STATEMENT_CACHE_SIZE', default=100, cast=int)
+DB_PGBOUNCER = config('DB_PGBOUNCER', default=False, cast=bool)
+DATABASE_READ_URL = config('DATABASE_READ_URL', default='')
+READ_YOUR_WRITES_SECONDS = config('READ_YOUR_WRITES_SECONDS', default=5, cast=int)
+READ_PRIMARY_COOKIE = 'read_primary_until'
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.overflow_connections = 0
+        self.wait_seconds_total = 0.0
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    # set by create_engine; labels this pool's series on /metrics
+    engine_name = 'primary'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        # dispose() swaps in a new pool; keep the totals counting up across it
+        pool = super().recreate()
+        pool.engine_name = self.engine_name
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        overflow = self.overflow()
+
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            self.stats.checkouts += 1
+            self.stats.wait_seconds_total += waited
+            DB_POOL_WAIT.observe({"engine": self.engine_name}, waited)
+
+            # overflow() counts up from -pool_size; only positive values are overflow
+            if self.overflow() > max(overflow, 0):
+                self.stats.overflow_connections += 1
+                DB_POOL_OVERFLOW_CONNECTIONS.inc({"engine": self.engine_name})
+
+    def metrics(self) -> dict:
+        return {
+            "pool_size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": self.stats.checkouts,
+            "overflow_connections": self.stats.overflow_connections,
+            "wait_seconds_total": self.stats.wait_seconds_total,
+        }
+
+
+def _connect_args() -> dict:
+    if DB_PGBOUNCER:
+        # transaction pooling hands each statement to an arbitrary server
+        # connection, so named prepared statements cannot be reused
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+
+    return {
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": DB_PREPARED_STATEMENT_CACHE_SIZE,
+    }
 
 
-engine = create_async_engine(config('DATABASE_URL'), future=True)
+def create_engine(url: str, name: str):
+    async_engine = create_async_engine(
+        url,
+        future=True,
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=_connect_args(),
+    )
+    async_engine.sync_engine.pool.engine_name = name
+    instrument_engine(async_engine)
+    return async_engine
+
+
+engine = create_engine(config('DATABASE_URL'), 'primary')
 SessionLocal = async_sessionmaker(
     engine,
     autoflush=False,
@@ -12,7 +116,43 @@ SessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+read_engine = create_engine(DATABASE_READ_URL, 'replica') if DATABASE_READ_URL else engine
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    autoflush=False,
+    autocommit=False,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 
 async def get_session():
     async with SessionLocal() as session:
         yield session
+
+
+def _reads_from_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_session(request: Request):
+    session_factory = SessionLocal if _reads_from_primary(request) else ReadSessionLocal
+
+    async with session_factory() as session:
+        yield session
+
+
+def mark_write(response: Response):
+    if read_engine is engine or READ_YOUR_WRITES_SECONDS <= 0:
+        return
+
+    # a cookie rather than worker memory, so every worker honours the window
+    response.set_cookie(
+        READ_PRIMARY_COOKIE,
+        str(time.time() + READ_YOUR_WRITES_SECONDS),
+        max_age=READ_YOUR_WRITES_SECONDS,
+        httponly=True,
+    )
@@ -1,14 +1,42 @@
-from fastapi import FastAPI
+import logging
+import time
 
-from app.db.session import engine
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+
+from app.core.metrics import RequestStats, request_stats, observe_request
+from app.core.tasks import start_task, start_periodic, start_worker, stop_background_tasks
+from app.core.listener import pg_listener
+from app.core.reference_cache import REFERENCE_CACHE_NOTIFY, REFERENCE_CACHE_CHANNEL, reference_cache
+from app.core.stock_feed import STOCK_EVENTS_NOTIFY, STOCK_EVENTS_CHANNEL, stock_feed
+from app.crud.stock_history import STOCK_SNAPSHOT_INTERVAL_HOURS, take_periodic_snapshot
+from app.crud.idempotency import IDEMPOTENCY_CLEANUP_INTERVAL_MINUTES, purge_expired_idempotency_keys
+from app.crud.operation_ingest import (
+    OPERATION_INGEST_ENABLED,
+    OPERATION_INGEST_WORKERS,
+    OPERATION_INGEST_POLL_MS,
+    OPERATION_INGEST_CLEANUP_INTERVAL_MINUTES,
+    drain_operation_ingest,
+    purge_processed_operation_ingest,
+)
+from app.crud.operation_partitions import (
+    OPERATION_PARTITION_MONTHS_AHEAD,
+    OPERATION_PARTITION_INTERVAL_HOURS,
+    OperationPartitionsCRUD,
+    maintain_operation_partitions,
+)
+from app.db.session import engine, SessionLocal
 from app.db.models import Base
 from app.api.user import router as user_router
 from app.api.warehouse import router as warehouse_router
 from app.api.product import router as product_router
 from app.api.stock import router as stock_router
 from app.api.inventory_operations import router as inventory_operations_router
+from app.api.metrics import router as metrics_router
+
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 
 @app.on_event("startup")
@@ -16,9 +44,77 @@ async def on_startup():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+    # inserts for a month without its partition would land in the default one;
+    # the periodic job retries, so a failure here must not keep the app down
+    try:
+        async with SessionLocal() as session:
+            await OperationPartitionsCRUD().ensure_partitions(session, OPERATION_PARTITION_MONTHS_AHEAD)
+    except Exception:
+        logger.exception("Could not create inventory_operation partitions")
+
+    if REFERENCE_CACHE_NOTIFY:
+        pg_listener.subscribe(REFERENCE_CACHE_CHANNEL, reference_cache.invalidate_table, on_gap=reference_cache.clear)
+
+    if STOCK_EVENTS_NOTIFY:
+        pg_listener.subscribe(STOCK_EVENTS_CHANNEL, stock_feed.dispatch, on_gap=stock_feed.resync)
+
+    if STOCK_SNAPSHOT_INTERVAL_HOURS > 0:
+        start_periodic("stock-snapshot", STOCK_SNAPSHOT_INTERVAL_HOURS * 3600, take_periodic_snapshot)
+
+    if IDEMPOTENCY_CLEANUP_INTERVAL_MINUTES > 0:
+        start_periodic(
+            "idempotency-cleanup", IDEMPOTENCY_CLEANUP_INTERVAL_MINUTES * 60, purge_expired_idempotency_keys
+        )
+
+    if OPERATION_PARTITION_INTERVAL_HOURS > 0:
+        start_periodic(
+            "operation-partitions", OPERATION_PARTITION_INTERVAL_HOURS * 3600, maintain_operation_partitions
+        )
+
+    if OPERATION_INGEST_ENABLED:
+        for index in range(OPERATION_INGEST_WORKERS):
+            start_worker(f"operation-ingest-{index}", OPERATION_INGEST_POLL_MS / 1000, drain_operation_ingest)
+
+        if OPERATION_INGEST_CLEANUP_INTERVAL_MINUTES > 0:
+            start_periodic(
+                "operation-ingest-cleanup",
+                OPERATION_INGEST_CLEANUP_INTERVAL_MINUTES * 60,
+                purge_processed_operation_ingest,
+            )
+
+    if pg_listener.callbacks:
+        start_task("pg-listener", pg_listener.run())
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await stop_background_tasks()
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    stats = RequestStats()
+    token = request_stats.set(stats)
+    started = time.perf_counter()
+
+    try:
+        response = await call_next(request)
+    finally:
+        request_stats.reset(token)
+
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    observe_request(
+        request.method, route.path if route else "unmatched", response.status_code, elapsed, stats
+    )
+
+    response.headers["Server-Timing"] = stats.server_timing(elapsed)
+    return response
+
 
 app.include_router(user_router, prefix="/auth", tags=["Auth"])
 app.include_router(warehouse_router, prefix="/warehouse", tags=["Warehouse"])
 app.include_router(product_router, prefix="/product", tags=["Product"])
 app.include_router(stock_router, prefix="/stock", tags=["Stock"])
 app.include_router(inventory_operations_router, prefix="/operations", tags=["Inventory Operations"])
+app.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
@@ -19,3 +19,15 @@ class TransferType(Enum):
     OUTBOUND = 'outbound'
     TRANSFER = 'transfer'
     ADJUSTMENT = 'adjustment'
+
+
+class ExportFormat(Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class IngestStatus(Enum):
+    pending = "pending"
+    applied = "applied"
+    rejected = "rejected"
+    failed = "failed"
@@ -0,0 +1,18 @@
+from typing import Generic, List, TypeVar
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+
+T = TypeVar("T")
+K = TypeVar("K")
+
+
+class IdsLookup(BaseModel):
+    ids: List[UUID] = Field(min_length=1, max_length=5000)
+
+
+class LookupResult(BaseModel, Generic[T, K]):
+    # items follow the request order; keys that matched nothing land in missing
+    items: List[T]
+    missing: List[K]
@@ -1,8 +1,9 @@
+from datetime import datetime
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field, model_validator, ConfigDict
 
-from app.schemas.enums.enums import TransferType
+from app.schemas.enums.enums import TransferType, IngestStatus
 from app.schemas.rules.inventory_operations import OPERATION_RULES
 
 
@@ -41,3 +42,30 @@ class InventoryOperationCreate(InventoryOperationsBase):
 
 class InventoryOperationsPublic(InventoryOperationsBase):
     id: int
+
+
+class InventoryOperationBatchCreate(BaseModel):
+    operations: List[InventoryOperationCreate] = Field(min_length=1, max_length=5000)
+
+
+class InventoryOperationLineResult(BaseModel):
+    index: int
+    accepted: bool
+    id: Optional[int] = None
+    detail: Optional[str] = None
+    replayed: bool = False
+
+
+class InventoryOperationBatchResult(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[InventoryOperationLineResult]
+
+
+class OperationTicket(BaseModel):
+    id: UUID
+    status: IngestStatus
+    operation_id: Optional[int] = None
+    detail: Optional[str] = None
+    enqueued_at: datetime
+    processed_at: Optional[datetime] = None
@@ -1,5 +1,7 @@
 from datetime import datetime
-from pydantic import BaseModel
+from typing import List
+from uuid import UUID
+from pydantic import BaseModel, Field
 
 from app.schemas.rout_schemas.product import ProductPublic
 from app.schemas.rout_schemas.warehouse import WarehousePublic
@@ -13,3 +15,32 @@ class StockBase(BaseModel):
 class StockPublic(StockBase):
     product: ProductPublic
     warehouse: WarehousePublic
+
+
+class ProductStockSummary(BaseModel):
+    product_id: UUID
+    quantity: float
+
+
+class WarehouseStockSummary(BaseModel):
+    warehouse_id: UUID
+    quantity: float
+
+
+class StockAsOf(BaseModel):
+    product_id: UUID
+    warehouse_id: UUID
+    quantity: float
+
+
+class StockSnapshotTaken(BaseModel):
+    taken_at: datetime
+
+
+class StockKey(BaseModel):
+    product_id: UUID
+    warehouse_id: UUID
+
+
+class StockLookup(BaseModel):
+    keys: List[StockKey] = Field(min_length=1, max_length=5000)
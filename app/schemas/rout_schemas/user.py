@@ -1,6 +1,6 @@
 from uuid import UUID
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 
 
 from app.schemas.enums.enums import UserRole
@@ -25,3 +25,6 @@ class UserPublic(UserBase):
     id: UUID
     role: UserRole
     is_active: bool
+
+    # role stays a plain string, the same as on the ORM row it is built from
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)
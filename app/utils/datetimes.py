@@ -0,0 +1,9 @@
+from datetime import datetime
+
+
+def naive_local(value: datetime | None) -> datetime | None:
+    # timestamps are stored as naive local time (datetime.now()); an aware value
+    # from the client is shifted into that zone, since asyncpg rejects it as is
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
@@ -0,0 +1,65 @@
+import csv
+import io
+from decimal import Decimal
+from uuid import UUID
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+from app.db.session import ReadSessionLocal
+from app.schemas.enums.enums import ExportFormat
+
+
+EXPORT_CHUNK_SIZE = 1000
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def _json_default(value):
+    # as a string, like pydantic does, so reconciliation sees the exact amount
+    if isinstance(value, Decimal):
+        return str(value)
+    # asyncpg returns its own UUID subclass, which orjson does not recognise
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError
+
+
+def _ndjson_chunk(columns: list[str], rows) -> bytes:
+    return b"".join(
+        orjson.dumps(dict(zip(columns, row)), default=_json_default) + b"\n"
+        for row in rows
+    )
+
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_rows(stmt, export_format: ExportFormat):
+    # own session: the request one may be closed before the body is sent
+    async with ReadSessionLocal() as session:
+        result = await session.stream(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        columns = list(result.keys())
+
+        if export_format == ExportFormat.csv:
+            yield _csv_chunk([columns])
+
+        async for rows in result.partitions():
+            if export_format == ExportFormat.csv:
+                yield _csv_chunk(rows)
+            else:
+                yield _ndjson_chunk(columns, rows)
+
+
+def export_response(stmt, export_format: ExportFormat, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_rows(stmt, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'},
+    )
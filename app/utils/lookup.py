@@ -0,0 +1,5 @@
+def lookup_result(keys: list, found: dict) -> dict:
+    return {
+        "items": [found[key] for key in keys if key in found],
+        "missing": [key for key in keys if key not in found],
+    }
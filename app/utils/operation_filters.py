@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import Query
+
+from app.db.models import InventoryOperation
+from app.schemas.enums.enums import TransferType
+from app.utils.datetimes import naive_local
+
+
+@dataclass(frozen=True)
+class OperationFilters:
+    conditions: list
+    # None means every type; kept apart so callers can skip branches that cannot match
+    types: Optional[frozenset[str]] = None
+
+
+def operation_filters(
+    since: Optional[datetime] = Query(None, description="Only operations created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only operations created before this time"),
+    type: Optional[List[TransferType]] = Query(None, description="Only operations of these types"),
+    product_id: Optional[UUID] = Query(None, description="Filter by product id"),
+    created_by: Optional[UUID] = Query(None, description="Filter by the user who created the operation"),
+):
+    conditions = []
+    types = frozenset(value.value for value in type) if type else None
+    since, until = naive_local(since), naive_local(until)
+
+    if since:
+        conditions.append(InventoryOperation.created_at >= since)
+    if until:
+        conditions.append(InventoryOperation.created_at < until)
+    if types:
+        conditions.append(InventoryOperation.type.in_(sorted(types)))
+    if product_id:
+        conditions.append(InventoryOperation.product_id == product_id)
+    if created_by:
+        conditions.append(InventoryOperation.created_by == created_by)
+
+    return OperationFilters(conditions, types)
@@ -0,0 +1,90 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from uuid import UUID
+
+from decouple import config
+from fastapi import HTTPException, status
+from sqlalchemy import and_, asc, desc, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+# a page is meant to be one index range scan, not a way to read a whole table
+MAX_PAGE_SIZE = config("MAX_PAGE_SIZE", default=500, cast=int)
+
+CURSOR_DECODERS = {
+    datetime: datetime.fromisoformat,
+    UUID: UUID,
+    int: int,
+}
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([
+        value.isoformat() if isinstance(value, datetime) else str(value)
+        for value in values
+    ])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list[InstrumentedAttribute]) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+
+        if len(values) != len(columns):
+            raise ValueError("cursor does not match sort key")
+
+        return [
+            CURSOR_DECODERS[column.type.python_type](value)
+            for column, value in zip(columns, values)
+        ]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Invalid cursor"
+        )
+
+
+def paginate(
+    stmt,
+    columns: list[InstrumentedAttribute],
+    cursor: str | None = None,
+    limit: int = 10,
+    descending: bool = False,
+):
+    if limit <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="limit must be greater than 0"
+        )
+
+    if limit > MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"limit must be at most {MAX_PAGE_SIZE}"
+        )
+
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        # the leading column bound keeps the predicate an index range scan
+        if descending:
+            stmt = stmt.where(and_(columns[0] <= values[0], tuple_(*columns) < tuple_(*values)))
+        else:
+            stmt = stmt.where(and_(columns[0] >= values[0], tuple_(*columns) > tuple_(*values)))
+
+    order = desc if descending else asc
+    return stmt.order_by(*(order(column) for column in columns)).limit(limit + 1)
+
+
+def build_page(items: list, columns: list[InstrumentedAttribute], limit: int) -> dict:
+    if len(items) <= limit:
+        return {"items": items, "next_cursor": None}
+
+    items = items[:limit]
+    last = items[-1]
+    return {
+        "items": items,
+        "next_cursor": encode_cursor([getattr(last, column.key) for column in columns]),
+    }
@@ -0,0 +1,19 @@
+from functools import lru_cache
+from typing import Any
+
+from fastapi import Response, status
+from pydantic import TypeAdapter
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def model_response(schema, content: Any, status_code: int = status.HTTP_200_OK) -> Response:
+    # Validates ORM objects or Core rows in one pass and writes JSON bytes
+    # straight from pydantic-core, skipping FastAPI's validate -> dict ->
+    # json.dumps round trip. Keep response_model on the route for the docs.
+    adapter = _adapter(schema)
+    body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+    return Response(content=body, status_code=status_code, media_type="application/json")
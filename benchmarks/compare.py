@@ -0,0 +1,74 @@
+"""Compare two benchmark result files.
+
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json
+
+Exits with status 1 when a scenario's p99 latency or throughput regresses
+by more than --threshold (default 10%).
+"""
+import argparse
+import json
+import sys
+
+
+METRICS = [
+    # name, higher is better
+    ("throughput_rps", True),
+    ("p50_ms", False),
+    ("p99_ms", False),
+    ("statements_avg", False),
+]
+GATED = {"throughput_rps", "p99_ms"}
+
+
+def _format(value) -> str:
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+
+def _change(base, new) -> float | None:
+    if base in (None, 0) or new is None:
+        return None
+    return (new - base) / base
+
+
+def compare(base: dict, new: dict, threshold: float) -> bool:
+    regressed = False
+
+    for scenario in sorted(set(base["scenarios"]) | set(new["scenarios"])):
+        print(scenario)
+        old_stats = base["scenarios"].get(scenario, {})
+        new_stats = new["scenarios"].get(scenario, {})
+
+        for name, higher_is_better in METRICS:
+            change = _change(old_stats.get(name), new_stats.get(name))
+            flag = ""
+
+            if change is not None and name in GATED:
+                worse = -change if higher_is_better else change
+                if worse > threshold:
+                    flag = "  REGRESSION"
+                    regressed = True
+
+            shown = "n/a" if change is None else f"{change:+.1%}"
+            print(f"  {name:16} {_format(old_stats.get(name)):>10} -> {_format(new_stats.get(name)):<10} {shown}{flag}")
+
+    for name in ("deadlocks", "rollbacks", "lock_waiters_max"):
+        print(f"{name:18} {base['database'][name]} -> {new['database'][name]}")
+
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    with open(args.base) as base_file, open(args.new) as new_file:
+        regressed = compare(json.load(base_file), json.load(new_file), args.threshold)
+
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
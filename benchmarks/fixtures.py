@@ -0,0 +1,19 @@
+"""In-memory ORM objects shared by the serialization benchmark and its test."""
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from app.db.models import Product, Stock, Warehouse
+
+
+def stock_page(size: int = 50) -> dict:
+    now = datetime(2026, 3, 1, 12, 30, 15, 123456)
+    items = []
+    for i in range(size):
+        product = Product(id=uuid.UUID(int=i), name=f"prodüct {i}", sku=f"SKU-{i}", unit="pcs", is_active=True, create_at=now)
+        warehouse = Warehouse(id=uuid.UUID(int=10_000 + i), name=f"w{i}", location="x", is_active=i % 2 == 0)
+        items.append(Stock(
+            product_id=product.id, warehouse_id=warehouse.id, product=product, warehouse=warehouse,
+            quantity=Decimal(i) / 4, updated_at=now,
+        ))
+    return {"items": items, "next_cursor": "abc"}
@@ -0,0 +1,244 @@
+"""Drive a mixed load against a running API and record the results.
+
+    python -m benchmarks.seed --products 1000 --warehouses 20
+    uvicorn app.main:app --workers 8 &
+    python -m benchmarks.run --duration 60 --concurrency 64 \\
+        --mix transfer=5,stock=3,history=2 --hot-skus 5 --hot-ratio 0.5
+
+Scenarios:
+    transfer  POST /operations/ transfers between random warehouses;
+              --hot-ratio of them hit the first --hot-skus products
+    stock     GET /stock/ cycling through every stock_filters combination
+    history   GET /warehouse/{id}/operations following next_cursor
+
+Results (throughput, p50/p99 latency, statements per request from the
+Server-Timing header, deadlocks and lock waits from pg_stat_*) are
+written to benchmarks/results/<timestamp>.json; compare two runs with
+benchmarks.compare.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import re
+import statistics
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import httpx
+from sqlalchemy import text
+
+from app.db.session import engine
+from benchmarks.seed import BENCH_EMAIL, BENCH_PASSWORD
+
+
+STATEMENTS_RE = re.compile(r'desc="(\d+) statements"')
+LOCK_SAMPLE_INTERVAL = 0.5
+
+
+class ScenarioStats:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.statements: list[int] = []
+        self.statuses: Counter = Counter()
+
+    def record(self, response: httpx.Response, elapsed: float):
+        self.latencies.append(elapsed)
+        self.statuses[response.status_code] += 1
+
+        match = STATEMENTS_RE.search(response.headers.get("server-timing", ""))
+        if match:
+            self.statements.append(int(match.group(1)))
+
+    def summary(self, duration: float) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "throughput_rps": len(latencies) / duration,
+            "p50_ms": _percentile(latencies, 0.50) * 1000,
+            "p99_ms": _percentile(latencies, 0.99) * 1000,
+            "statements_avg": statistics.fmean(self.statements) if self.statements else None,
+            "statements_max": max(self.statements, default=None),
+            "statuses": {str(code): count for code, count in sorted(self.statuses.items())},
+        }
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def _stock_filter_combinations(product_ids: list[str], warehouse_ids: list[str]):
+    for product, warehouse, zero, active in itertools.product([False, True], repeat=4):
+        params = {"zero_quantity": zero, "active_warehouse": active}
+        if product:
+            params["product_id"] = product_ids
+        if warehouse:
+            params["warehouse_id"] = warehouse_ids
+        yield params
+
+
+class LoadRunner:
+    def __init__(self, client: httpx.AsyncClient, seeded: dict, args):
+        self.client = client
+        self.products = seeded["products"]
+        self.warehouses = seeded["warehouses"]
+        self.hot_products = self.products[:args.hot_skus]
+        self.hot_ratio = args.hot_ratio
+        self.history_pages = args.history_pages
+        self.stats: dict[str, ScenarioStats] = defaultdict(ScenarioStats)
+        self.stock_filters = itertools.cycle(list(_stock_filter_combinations(self.products, self.warehouses)))
+
+    async def _request(self, scenario: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        self.stats[scenario].record(response, time.perf_counter() - started)
+        return response
+
+    async def transfer(self):
+        hot = self.hot_products and random.random() < self.hot_ratio
+        product_id = random.choice(self.hot_products if hot else self.products)
+        from_warehouse, to_warehouse = random.sample(self.warehouses, 2)
+
+        await self._request("transfer", "POST", "/operations/", json={
+            "type": "transfer",
+            "product_id": product_id,
+            "quantity": 1,
+            "from_warehouse_id": from_warehouse,
+            "to_warehouse_id": to_warehouse,
+        })
+
+    async def stock(self):
+        params = dict(next(self.stock_filters))
+        for key in ("product_id", "warehouse_id"):
+            if key in params:
+                params[key] = random.choice(params[key])
+
+        await self._request("stock", "GET", "/stock/", params=params)
+
+    async def history(self):
+        warehouse_id = random.choice(self.warehouses)
+        cursor = None
+
+        for _ in range(self.history_pages):
+            params = {"limit": 50, **({"cursor": cursor} if cursor else {})}
+            response = await self._request("history", "GET", f"/warehouse/{warehouse_id}/operations", params=params)
+
+            if response.status_code != 200:
+                break
+            cursor = response.json().get("next_cursor")
+            if not cursor:
+                break
+
+    async def worker(self, scenarios: list, deadline: float):
+        while time.monotonic() < deadline:
+            await getattr(self, random.choice(scenarios))()
+
+
+async def _database_counters() -> dict:
+    async with engine.connect() as conn:
+        row = (await conn.execute(text(
+            "SELECT deadlocks, xact_commit, xact_rollback FROM pg_stat_database "
+            "WHERE datname = current_database()"
+        ))).one()
+    return dict(row._mapping)
+
+
+async def _sample_lock_waits(samples: list[int], stop: asyncio.Event):
+    async with engine.connect() as conn:
+        while not stop.is_set():
+            waiting = await conn.scalar(text(
+                "SELECT count(*) FROM pg_stat_activity WHERE wait_event_type = 'Lock'"
+            ))
+            samples.append(waiting)
+            try:
+                await asyncio.wait_for(stop.wait(), LOCK_SAMPLE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+def _parse_mix(mix: str) -> list[str]:
+    scenarios = []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        scenarios.extend([name.strip()] * int(weight or 1))
+    return scenarios
+
+
+async def run(args) -> dict:
+    with open(args.seed) as file:
+        seeded = json.load(file)
+
+    scenarios = _parse_mix(args.mix)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        login = await client.post("/auth/login/", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+        login.raise_for_status()
+        client.cookies.set("access_token", login.json()["access_token"])
+
+        runner = LoadRunner(client, seeded, args)
+        before = await _database_counters()
+        lock_samples: list[int] = []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(_sample_lock_waits(lock_samples, stop))
+
+        started_at = datetime.now()
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(runner.worker(scenarios, deadline) for _ in range(args.concurrency)))
+        duration = time.monotonic() - started
+
+        stop.set()
+        await sampler
+        after = await _database_counters()
+
+    await engine.dispose()
+    return {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "config": {
+            key: getattr(args, key)
+            for key in ("duration", "concurrency", "mix", "hot_skus", "hot_ratio", "history_pages")
+        },
+        "dataset": {"products": len(seeded["products"]), "warehouses": len(seeded["warehouses"])},
+        "duration_seconds": duration,
+        "scenarios": {name: stats.summary(duration) for name, stats in sorted(runner.stats.items())},
+        "database": {
+            "deadlocks": after["deadlocks"] - before["deadlocks"],
+            "rollbacks": after["xact_rollback"] - before["xact_rollback"],
+            "lock_waiters_max": max(lock_samples, default=0),
+            "lock_waiters_avg": statistics.fmean(lock_samples) if lock_samples else 0,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--seed", default="benchmarks/seed.json")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", default="transfer=5,stock=3,history=2")
+    parser.add_argument("--hot-skus", type=int, default=5)
+    parser.add_argument("--hot-ratio", type=float, default=0.3)
+    parser.add_argument("--history-pages", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output-dir", default="benchmarks/results")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    started_at = datetime.fromisoformat(results["started_at"])
+    path = os.path.join(args.output_dir, f"{started_at:%Y%m%d-%H%M%S}.json")
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
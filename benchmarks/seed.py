@@ -0,0 +1,109 @@
+"""Seed a database with N products x M warehouses for benchmarking.
+
+    python -m benchmarks.seed --products 1000 --warehouses 20
+
+Uses DATABASE_URL like the application and writes a benchmark admin
+user (BENCH_EMAIL / BENCH_PASSWORD) that run.py logs in with.
+"""
+import argparse
+import asyncio
+import json
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert, delete, select, text
+
+from app.auth.hashing import hash_password
+from app.crud.stock_summary import StockSummaryCRUD
+from app.db.models import (
+    Base, User, Warehouse, Product, Stock, InventoryOperation, StockProductSummary
+)
+from app.db.session import engine, SessionLocal
+from app.schemas.enums.enums import UserRole
+
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+BENCH_PREFIX = "bench-"
+INSERT_CHUNK = 5000
+
+
+async def seed(products: int, warehouses: int, quantity: int) -> dict:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with SessionLocal() as session:
+        await _clear(session)
+
+        user_id = uuid.uuid4()
+        await session.execute(insert(User).values(
+            id=user_id,
+            firstname="Bench",
+            lastname="User",
+            email=BENCH_EMAIL,
+            hashed_password=await hash_password(BENCH_PASSWORD),
+            role=UserRole.admin.value,
+        ))
+
+        warehouse_ids = [uuid.uuid4() for _ in range(warehouses)]
+        await session.execute(insert(Warehouse), [
+            {"id": warehouse_id, "name": f"{BENCH_PREFIX}warehouse-{index}", "location": "bench"}
+            for index, warehouse_id in enumerate(warehouse_ids)
+        ])
+
+        product_ids = [uuid.uuid4() for _ in range(products)]
+        await session.execute(insert(Product), [
+            {"id": product_id, "name": f"{BENCH_PREFIX}product-{index}", "sku": f"BENCH-{index:08d}", "unit": "pcs"}
+            for index, product_id in enumerate(product_ids)
+        ])
+
+        now = datetime.now()
+        rows = [
+            {"product_id": product_id, "warehouse_id": warehouse_id, "quantity": quantity, "updated_at": now}
+            for product_id in product_ids
+            for warehouse_id in warehouse_ids
+        ]
+        for start in range(0, len(rows), INSERT_CHUNK):
+            await session.execute(insert(Stock), rows[start:start + INSERT_CHUNK])
+
+        await StockSummaryCRUD().rebuild(session)
+        await session.execute(text("ANALYZE"))
+        await session.commit()
+
+    await engine.dispose()
+    return {
+        "products": [str(product_id) for product_id in product_ids],
+        "warehouses": [str(warehouse_id) for warehouse_id in warehouse_ids],
+    }
+
+
+async def _clear(session):
+    products = select(Product.id).where(Product.name.startswith(BENCH_PREFIX))
+    warehouses = select(Warehouse.id).where(Warehouse.name.startswith(BENCH_PREFIX))
+
+    await session.execute(delete(InventoryOperation).where(InventoryOperation.product_id.in_(products)))
+    await session.execute(delete(Stock).where(Stock.product_id.in_(products)))
+    await session.execute(delete(Stock).where(Stock.warehouse_id.in_(warehouses)))
+    await session.execute(delete(StockProductSummary).where(StockProductSummary.product_id.in_(products)))
+    await session.execute(delete(Product).where(Product.id.in_(products)))
+    await session.execute(delete(Warehouse).where(Warehouse.id.in_(warehouses)))
+    await session.execute(delete(User).where(User.email == BENCH_EMAIL))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--warehouses", type=int, default=20)
+    parser.add_argument("--quantity", type=int, default=1_000_000)
+    parser.add_argument("--output", default="benchmarks/seed.json")
+    args = parser.parse_args()
+
+    seeded = asyncio.run(seed(args.products, args.warehouses, args.quantity))
+    with open(args.output, "w") as file:
+        json.dump(seeded, file)
+
+    print(f"Seeded {args.products} products x {args.warehouses} warehouses into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Time list-page serialization: FastAPI's default path against model_response.
+
+    python -m benchmarks.serialization --rows 1000 --repeat 50
+
+Builds one page of StockPublic items from in-memory ORM objects, so no
+database is needed, and prints milliseconds per page for each path.
+"""
+import argparse
+import json
+import time
+
+from fastapi.utils import create_model_field
+
+from app.schemas.rout_schemas.pagination import Page
+from app.schemas.rout_schemas.stock import StockPublic
+from app.utils.responses import model_response
+from benchmarks.fixtures import stock_page
+
+
+def _default(field, page) -> bytes:
+    # what FastAPI does for response_model plus JSONResponse
+    value, _ = field.validate(page, {}, loc=("response",))
+    return json.dumps(
+        field.serialize(value), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode()
+
+
+def _fast(page) -> bytes:
+    return model_response(Page[StockPublic], page).body
+
+
+def _time(fn, repeat: int) -> float:
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    page = stock_page(args.rows)
+    field = create_model_field(name="Response", type_=Page[StockPublic], mode="serialization")
+
+    if _default(field, page) != _fast(page):
+        raise SystemExit("outputs differ")
+
+    print(f"default        {_time(lambda: _default(field, page), args.repeat):.2f} ms/page")
+    print(f"model_response {_time(lambda: _fast(page), args.repeat):.2f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
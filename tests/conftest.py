@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+# app modules read their settings at import time. Database tests run only
+# against TEST_DATABASE_URL, because they drop and recreate the public schema.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://postgres@localhost/logistics_test")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def database():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    from sqlalchemy import text
+
+    from app.core.reference_cache import reference_cache
+    from app.db.models import Base
+    from app.db.session import engine
+
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA public CASCADE"))
+        await conn.execute(text("CREATE SCHEMA public"))
+        await conn.run_sync(Base.metadata.create_all)
+
+    reference_cache.clear()
+    yield engine
+    # each test runs on its own event loop; pooled connections cannot follow it
+    await engine.dispose()
+
+
+@pytest.fixture
+async def session(database):
+    from app.db.session import SessionLocal
+
+    async with SessionLocal() as session:
+        yield session
@@ -0,0 +1,28 @@
+import asyncio
+from contextvars import ContextVar
+
+import pytest
+
+from app.core.batching import KeyedBatcher
+
+
+pytestmark = pytest.mark.anyio
+
+caller: ContextVar[str | None] = ContextVar("caller", default=None)
+
+
+async def test_apply_does_not_run_in_the_first_callers_context():
+    seen = []
+
+    async def apply(items):
+        seen.append(caller.get())
+        return items
+
+    batcher = KeyedBatcher(apply, window=0.01, max_batch=10)
+
+    async def submit(name):
+        caller.set(name)
+        return await batcher.submit("key", name)
+
+    assert await asyncio.gather(submit("first"), submit("second")) == ["first", "second"]
+    assert seen == [None]
@@ -0,0 +1,18 @@
+from datetime import datetime, timedelta, timezone
+
+from app.utils.datetimes import naive_local
+
+
+def test_naive_values_pass_through():
+    value = datetime(2026, 3, 1, 12, 30)
+    assert naive_local(value) is value
+    assert naive_local(None) is None
+
+
+def test_aware_values_become_naive_local_time():
+    value = datetime(2026, 3, 1, 12, 30, tzinfo=timezone(timedelta(hours=5)))
+    result = naive_local(value)
+
+    assert result.tzinfo is None
+    assert result == value.astimezone().replace(tzinfo=None)
+    assert result.astimezone() == value
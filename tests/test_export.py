@@ -0,0 +1,19 @@
+from decimal import Decimal
+from uuid import UUID
+
+import orjson
+
+from app.utils.export import _ndjson_chunk
+
+
+def test_ndjson_keeps_decimal_precision():
+    chunk = _ndjson_chunk(
+        ["product_id", "quantity"],
+        [(UUID(int=1), Decimal("12345678.91")), (UUID(int=2), Decimal("0.10"))],
+    )
+
+    rows = [orjson.loads(line) for line in chunk.splitlines()]
+    assert rows == [
+        {"product_id": str(UUID(int=1)), "quantity": "12345678.91"},
+        {"product_id": str(UUID(int=2)), "quantity": "0.10"},
+    ]
@@ -0,0 +1,36 @@
+import pytest
+
+from app.api.metrics import get_metrics
+from app.db.session import engine
+
+
+pytestmark = pytest.mark.anyio
+
+
+def metric_types(body: str) -> dict[str, str]:
+    return {
+        line.split()[2]: line.split()[3]
+        for line in body.splitlines()
+        if line.startswith("# TYPE db_pool")
+    }
+
+
+async def test_pool_totals_are_not_gauges():
+    types = metric_types((await get_metrics()).body.decode())
+
+    assert types == {
+        "db_pool_wait_seconds": "histogram",
+        "db_pool_overflow_connections_total": "counter",
+        "db_pool_size": "gauge",
+        "db_pool_checked_out": "gauge",
+        "db_pool_checked_in": "gauge",
+        "db_pool_overflow": "gauge",
+    }
+
+
+def test_recreated_pool_keeps_counting():
+    pool = engine.sync_engine.pool
+    recreated = pool.recreate()
+
+    assert recreated.stats is pool.stats
+    assert recreated.engine_name == "primary"
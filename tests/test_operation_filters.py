@@ -0,0 +1,89 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.crud.idempotency import IdempotencyCRUD
+from app.crud.inventory_oprations import InventoryOperationsCRUD
+from app.crud.stock import StockCRUD
+from app.crud.stock_summary import StockSummaryCRUD
+from app.db.models import Warehouse
+from app.schemas.enums.enums import TransferType
+from app.utils.operation_filters import OperationFilters, operation_filters
+
+
+def compiled(condition) -> str:
+    return str(condition.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def filters(**params) -> OperationFilters:
+    # called directly, so every Query default has to be passed explicitly
+    defaults = dict(since=None, until=None, type=None, product_id=None, created_by=None)
+    return operation_filters(**{**defaults, **params})
+
+
+@pytest.fixture
+def crud():
+    return InventoryOperationsCRUD(
+        stock_crud=StockCRUD(),
+        stock_summary_crud=StockSummaryCRUD(),
+        idempotency_crud=IdempotencyCRUD(),
+    )
+
+
+def test_no_params_means_no_conditions_and_every_type():
+    result = filters()
+
+    assert result.conditions == []
+    assert result.types is None
+
+
+def test_params_become_conditions():
+    product_id, user_id = uuid.uuid4(), uuid.uuid4()
+    result = filters(
+        since=datetime(2026, 1, 1),
+        until=datetime(2026, 2, 1),
+        type=[TransferType.OUTBOUND, TransferType.INBOUND],
+        product_id=product_id,
+        created_by=user_id,
+    )
+
+    assert result.types == frozenset({"inbound", "outbound"})
+    assert [compiled(condition) for condition in result.conditions] == [
+        "inventory_operation.created_at >= '2026-01-01 00:00:00'",
+        "inventory_operation.created_at < '2026-02-01 00:00:00'",
+        "inventory_operation.type IN ('inbound', 'outbound')",
+        f"inventory_operation.product_id = '{product_id}'",
+        f"inventory_operation.created_by = '{user_id}'",
+    ]
+
+
+def test_aware_bounds_are_compared_as_naive_local_time():
+    since = datetime(2026, 1, 1, 9, tzinfo=timezone(timedelta(hours=3)))
+    (condition,) = filters(since=since).conditions
+
+    bound = condition.right.value
+    assert bound.tzinfo is None
+    assert bound == since.astimezone().replace(tzinfo=None)
+
+
+def test_warehouse_columns_follow_the_types(crud):
+    def keys(types):
+        return [column.key for column in crud._warehouse_columns(types)]
+
+    assert keys(None) == ["from_warehouse_id", "to_warehouse_id"]
+    assert keys(frozenset({"outbound"})) == ["from_warehouse_id"]
+    assert keys(frozenset({"inbound"})) == ["to_warehouse_id"]
+    assert keys(frozenset({"adjustment"})) == []
+
+
+@pytest.mark.anyio
+async def test_adjustment_only_returns_an_empty_page_without_a_query(crud):
+    warehouse = Warehouse(id=uuid.uuid4(), name="w", location="x")
+    adjustments = filters(type=[TransferType.ADJUSTMENT])
+
+    # no session: there is nothing the database could return
+    page = await crud.get_warehouse_operations(warehouse, None, filters=adjustments)
+
+    assert page == {"items": [], "next_cursor": None}
@@ -0,0 +1,189 @@
+import csv
+import gzip
+import importlib.util
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import select, text
+
+from app.crud.operation_partitions import OperationPartitionsCRUD, add_months, partition_name
+from app.db.models import InventoryOperation, Product, User, Warehouse
+
+
+pytestmark = pytest.mark.anyio
+
+MIGRATION = Path(__file__).parent.parent / "alembic" / "versions" / "c3f7a1d94e62_partition_inventory_operation.py"
+
+
+@pytest.fixture
+async def refs(session):
+    user = User(firstname="a", lastname="b", email="a@example.com", role="admin")
+    product = Product(name="p", sku="SKU-1", unit="pcs")
+    warehouse = Warehouse(name="w", location="x")
+    session.add_all([user, product, warehouse])
+    await session.commit()
+    return {"created_by": user.id, "product_id": product.id, "to_warehouse_id": warehouse.id}
+
+
+def operation(refs: dict, created_at: datetime) -> InventoryOperation:
+    return InventoryOperation(type="inbound", quantity=Decimal("1.50"), created_at=created_at, **refs)
+
+
+async def partition_of(session, operation_id: int) -> str:
+    return await session.scalar(text(
+        "SELECT tableoid::regclass::text FROM inventory_operation WHERE id = :id"
+    ), {"id": operation_id})
+
+
+async def test_ensure_partitions_creates_missing_months_once(session):
+    crud = OperationPartitionsCRUD()
+    current = date.today().replace(day=1)
+
+    created = await crud.ensure_partitions(session, 2)
+
+    assert created == [partition_name(add_months(current, offset)) for offset in range(3)]
+    assert await crud.ensure_partitions(session, 2) == []
+    assert sorted(await crud.get_partitions(session)) == [add_months(current, offset) for offset in range(3)]
+
+
+async def test_ensure_partitions_moves_rows_out_of_the_default_partition(session, refs):
+    crud = OperationPartitionsCRUD()
+    later = add_months(date.today().replace(day=1), 5)
+    row = operation(refs, datetime.combine(later, datetime.min.time()) + timedelta(days=3))
+    session.add(row)
+    await session.commit()
+    row_id = row.id
+
+    assert await partition_of(session, row_id) == "inventory_operation_default"
+
+    created = await crud.ensure_partitions(session, 6)
+
+    assert partition_name(later) in created
+    assert await partition_of(session, row_id) == partition_name(later)
+    assert await session.scalar(select(InventoryOperation.quantity).where(InventoryOperation.id == row_id)) == Decimal("1.50")
+
+
+async def test_archive_partitions_exports_and_drops_old_months(session, refs, tmp_path):
+    crud = OperationPartitionsCRUD()
+    current = date.today().replace(day=1)
+    old = add_months(current, -14)
+    await session.execute(text(
+        f"CREATE TABLE {partition_name(old)} PARTITION OF inventory_operation "
+        f"FOR VALUES FROM ('{old}') TO ('{add_months(old, 1)}')"
+    ))
+    await session.commit()
+    await crud.ensure_partitions(session, 0)
+
+    old_rows = [operation(refs, datetime.combine(old, datetime.min.time()) + timedelta(days=day)) for day in (1, 2)]
+    kept = operation(refs, datetime.now())
+    session.add_all([*old_rows, kept])
+    await session.commit()
+    old_ids, kept_id = sorted(row.id for row in old_rows), kept.id
+
+    archived = await crud.archive_partitions(session, 12, str(tmp_path))
+
+    assert archived == [partition_name(old)]
+    assert sorted(await crud.get_partitions(session)) == [current]
+    assert await session.scalar(text(f"SELECT to_regclass('{partition_name(old)}')")) is None
+    assert (await session.scalars(select(InventoryOperation.id))).all() == [kept_id]
+
+    with gzip.open(tmp_path / f"{partition_name(old)}.csv.gz", "rt") as archive:
+        rows = list(csv.DictReader(archive))
+    assert sorted(int(row["id"]) for row in rows) == old_ids
+    assert {row["quantity"] for row in rows} == {"1.50"}
+    assert not list(tmp_path.glob("*.part"))
+
+
+async def test_archive_partitions_exports_and_deletes_old_default_rows(session, refs, tmp_path):
+    crud = OperationPartitionsCRUD()
+    await crud.ensure_partitions(session, 0)
+    old = operation(refs, datetime.combine(add_months(date.today().replace(day=1), -14), datetime.min.time()))
+    recent = operation(refs, datetime.combine(add_months(date.today().replace(day=1), -2), datetime.min.time()))
+    session.add_all([old, recent])
+    await session.commit()
+    old_id, recent_id = old.id, recent.id
+
+    assert await partition_of(session, old_id) == "inventory_operation_default"
+
+    assert await crud.archive_partitions(session, 12, str(tmp_path)) == ["inventory_operation_default"]
+    assert await crud.archive_partitions(session, 12, str(tmp_path)) == []
+
+    assert (await session.scalars(select(InventoryOperation.id))).all() == [recent_id]
+    with gzip.open(tmp_path / f"inventory_operation_default_{old_id}_{old_id}.csv.gz", "rt") as archive:
+        assert [int(row["id"]) for row in csv.DictReader(archive)] == [old_id]
+
+
+def _run_migration(connection, step: str):
+    spec = importlib.util.spec_from_file_location("partition_migration", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    # like env.py, so the upgrade's autocommit block can end the transaction
+    context = MigrationContext.configure(connection)
+    with Operations.context(context), context.begin_transaction():
+        getattr(migration, step)()
+
+
+async def test_migration_partitions_existing_rows(database, session, refs):
+    # rebuild the ledger the way the previous revision left it
+    await session.execute(text("DROP TABLE inventory_operation"))
+    await session.execute(text(
+        'CREATE TABLE inventory_operation ('
+        'id SERIAL PRIMARY KEY, type VARCHAR(20) NOT NULL, quantity NUMERIC(10, 2) NOT NULL, '
+        'product_id UUID NOT NULL REFERENCES product (id), '
+        'from_warehouse_id UUID REFERENCES warehouse (id), to_warehouse_id UUID REFERENCES warehouse (id), '
+        'created_at TIMESTAMP NOT NULL, created_by UUID NOT NULL REFERENCES "user" (id), comment TEXT)'
+    ))
+    for name, columns in (
+        ("ix_inventory_operation_from_warehouse_id_created_at", "from_warehouse_id, created_at"),
+        ("ix_inventory_operation_to_warehouse_id_created_at", "to_warehouse_id, created_at"),
+        ("ix_inventory_operation_product_id_created_at", "product_id, created_at"),
+        ("ix_inventory_operation_created_at", "created_at"),
+    ):
+        await session.execute(text(f"CREATE INDEX {name} ON inventory_operation ({columns})"))
+
+    now = datetime.now()
+    current = now.date().replace(day=1)
+    stamps = [datetime.combine(add_months(current, -14), datetime.min.time()) + timedelta(days=2), now - timedelta(days=40), now]
+    for created_at in stamps:
+        await session.execute(text(
+            "INSERT INTO inventory_operation (type, quantity, product_id, to_warehouse_id, created_at, created_by) "
+            "VALUES ('inbound', 2, :product_id, :to_warehouse_id, :created_at, :created_by)"
+        ), {**refs, "created_at": created_at})
+    ledger = await session.scalar(text("SELECT 'inventory_operation'::regclass::oid"))
+    await session.commit()
+
+    async with database.connect() as conn:
+        await conn.run_sync(_run_migration, "upgrade")
+
+    # the old table is attached as is and covers everything up to the end of next month
+    legacy = partition_name(add_months(current, 1))
+    assert await session.scalar(text(f"SELECT '{legacy}'::regclass::oid")) == ledger
+    # its own indexes were reused rather than built again
+    assert await session.scalar(text(f"SELECT count(*) FROM pg_indexes WHERE tablename = '{legacy}'")) == 1 + 4
+    crud = OperationPartitionsCRUD()
+    assert sorted(await crud.get_partitions(session)) == [add_months(current, offset) for offset in (1, 2, 3)]
+
+    rows = (await session.execute(text(
+        "SELECT id, created_at, tableoid::regclass::text FROM inventory_operation ORDER BY id"
+    ))).all()
+    assert [(row.id, row.created_at) for row in rows] == list(enumerate(stamps, start=1))
+    assert [row.tableoid for row in rows] == [legacy] * len(stamps)
+
+    # the sequence carried over, so new operations continue after the existing ids
+    new_id = await session.scalar(text(
+        "INSERT INTO inventory_operation (type, quantity, product_id, to_warehouse_id, created_at, created_by) "
+        "VALUES ('inbound', 1, :product_id, :to_warehouse_id, now(), :created_by) RETURNING id"
+    ), refs)
+    assert new_id == len(stamps) + 1
+    await session.commit()
+
+    async with database.connect() as conn:
+        await conn.run_sync(_run_migration, "downgrade")
+
+    assert await session.scalar(text("SELECT relkind::text FROM pg_class WHERE relname = 'inventory_operation'")) == "r"
+    assert await session.scalar(text("SELECT count(*) FROM inventory_operation")) == len(stamps) + 1
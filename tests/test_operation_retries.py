@@ -0,0 +1,69 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import DBAPIError
+
+from app.crud import inventory_oprations
+from app.crud.inventory_oprations import OPERATION_FAILED, STOCK_BUSY, with_retries
+
+
+pytestmark = pytest.mark.anyio
+
+
+class DriverError(Exception):
+    def __init__(self, sqlstate: str):
+        super().__init__(f"INSERT INTO secret VALUES ('hunter2') failed with {sqlstate}")
+        self.sqlstate = sqlstate
+
+
+class FakeSession:
+    def __init__(self):
+        self.rollbacks = 0
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def failing(*sqlstates: str, result="done"):
+    errors = iter(sqlstates)
+
+    async def attempt():
+        sqlstate = next(errors, None)
+        if sqlstate is None:
+            return result
+        raise DBAPIError("INSERT INTO secret", {"password": "hunter2"}, DriverError(sqlstate))
+
+    return attempt
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(inventory_oprations, "OPERATION_RETRY_BASE_MS", 0)
+
+
+async def test_deadlocks_and_serialization_failures_are_retried():
+    session = FakeSession()
+
+    assert await with_retries(failing("40P01", "40001"), session) == "done"
+    assert session.rollbacks == 2
+
+
+async def test_busy_after_the_last_attempt():
+    session = FakeSession()
+
+    with pytest.raises(HTTPException) as raised:
+        await with_retries(failing(*["40P01"] * inventory_oprations.OPERATION_RETRY_ATTEMPTS), session)
+
+    assert raised.value.status_code == 503
+    assert raised.value.detail == STOCK_BUSY
+    assert session.rollbacks == inventory_oprations.OPERATION_RETRY_ATTEMPTS
+
+
+async def test_other_database_errors_do_not_leak_sql():
+    session = FakeSession()
+
+    with pytest.raises(HTTPException) as raised:
+        await with_retries(failing("23503"), session)
+
+    assert raised.value.status_code == 400
+    assert raised.value.detail == OPERATION_FAILED
+    assert session.rollbacks == 1
@@ -0,0 +1,24 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.db.models import Stock
+from app.utils.pagination import MAX_PAGE_SIZE, paginate
+
+
+SORT_KEYS = [Stock.product_id, Stock.warehouse_id]
+
+
+def test_limit_up_to_the_maximum_is_accepted():
+    stmt = paginate(select(Stock), SORT_KEYS, limit=MAX_PAGE_SIZE)
+
+    # one extra row tells whether there is a next page
+    assert stmt._limit == MAX_PAGE_SIZE + 1
+
+
+@pytest.mark.parametrize("limit", [0, MAX_PAGE_SIZE + 1])
+def test_limit_out_of_range_is_rejected(limit):
+    with pytest.raises(HTTPException) as raised:
+        paginate(select(Stock), SORT_KEYS, limit=limit)
+
+    assert raised.value.status_code == 422
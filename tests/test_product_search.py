@@ -0,0 +1,12 @@
+from sqlalchemy.dialects import postgresql
+
+from app.crud.product import ProductCRUD
+
+
+def test_search_filters_on_the_partial_index_predicate():
+    sql = str(ProductCRUD().search_query("abc").compile(dialect=postgresql.dialect()))
+    where = sql.split("WHERE ", 1)[1]
+
+    # the trigram indexes are partial on "WHERE is_active"; "IS true" would not match them
+    assert where.startswith("product.is_active AND ")
+    assert "IS true" not in where
@@ -0,0 +1,26 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.schemas.rout_schemas.pagination import Page
+from app.schemas.rout_schemas.stock import StockPublic
+from app.utils.responses import model_response
+from benchmarks.fixtures import stock_page
+
+
+def test_model_response_matches_default_serialization():
+    page = stock_page()
+    app = FastAPI()
+
+    @app.get("/default", response_model=Page[StockPublic])
+    async def default():
+        return page
+
+    @app.get("/fast", response_model=Page[StockPublic])
+    async def fast():
+        return model_response(Page[StockPublic], page)
+
+    client = TestClient(app)
+    default_response, fast_response = client.get("/default"), client.get("/fast")
+
+    assert fast_response.headers["content-type"] == default_response.headers["content-type"]
+    assert fast_response.content == default_response.content
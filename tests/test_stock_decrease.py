@@ -0,0 +1,40 @@
+from decimal import Decimal
+
+import pytest
+
+from app.crud.stock import StockCRUD
+from app.db.models import Product, Stock, Warehouse
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def stock(session):
+    product = Product(name="p", sku="SKU-1", unit="pcs")
+    stocked, empty = Warehouse(name="w1", location="x"), Warehouse(name="w2", location="y")
+    session.add_all([product, stocked, empty])
+    await session.flush()
+    session.add(Stock(product_id=product.id, warehouse_id=stocked.id, quantity=Decimal("5")))
+    await session.commit()
+    return product.id, stocked.id, empty.id
+
+
+async def test_decrease_applies_within_the_balance(session, stock):
+    product_id, warehouse_id, _ = stock
+
+    assert await StockCRUD().decrease(product_id, warehouse_id, Decimal("2"), session) == Decimal("3")
+
+
+async def test_decrease_below_zero_is_insufficient(session, stock):
+    product_id, warehouse_id, _ = stock
+
+    with pytest.raises(ValueError):
+        await StockCRUD().decrease(product_id, warehouse_id, Decimal("6"), session)
+
+
+async def test_decrease_without_a_stock_row_is_not_found(session, stock):
+    product_id, _, empty_id = stock
+
+    with pytest.raises(LookupError):
+        await StockCRUD().decrease(product_id, empty_id, Decimal("1"), session)
@@ -0,0 +1,45 @@
+import asyncio
+import gc
+
+import pytest
+
+from app.api import stock as stock_api
+from app.core.stock_feed import stock_feed
+
+
+pytestmark = pytest.mark.anyio
+
+
+class ClosedSocket:
+    # accepts, then fails every send while the client never says anything
+    def __init__(self):
+        self.disconnect = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        raise RuntimeError("Cannot call send once a close message has been sent")
+
+    async def receive(self):
+        await self.disconnect.wait()
+        return {"type": "websocket.disconnect"}
+
+
+async def test_failed_send_ends_the_subscription(monkeypatch):
+    monkeypatch.setattr(stock_api, "STOCK_EVENTS_NOTIFY", True)
+    unretrieved = []
+    loop = asyncio.get_running_loop()
+    loop.set_exception_handler(lambda loop, context: unretrieved.append(context))
+
+    handler = asyncio.create_task(stock_api.stock_changes(ClosedSocket()))
+    await asyncio.sleep(0)
+    (subscription,) = stock_feed.subscriptions
+    subscription.push('{"type": "stock"}')
+
+    # ends on the failed send alone; the socket never reports a disconnect
+    await asyncio.wait_for(handler, 1)
+    gc.collect()
+
+    assert not stock_feed.subscriptions
+    assert unretrieved == []
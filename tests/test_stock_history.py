@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select, text
+
+from app.crud.stock_history import StockHistoryCRUD
+from app.db.models import Product, Stock, StockSnapshot, StockSnapshotRun, Warehouse
+from app.db.session import SessionLocal
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def stock(session):
+    product, warehouse = Product(name="p", sku="SKU-1", unit="pcs"), Warehouse(name="w", location="x")
+    session.add_all([product, warehouse])
+    await session.flush()
+    session.add(Stock(product_id=product.id, warehouse_id=warehouse.id, quantity=Decimal("5")))
+    await session.commit()
+    return product.id, warehouse.id
+
+
+async def test_stock_writes_are_not_blocked_by_the_copy(session, stock):
+    product_id, warehouse_id = stock
+
+    async with SessionLocal() as blocker, SessionLocal() as writer:
+        # holds the copy at its INSERT into stock_snapshot, after the snapshot is pinned
+        await blocker.execute(text("LOCK TABLE stock_snapshot IN ACCESS EXCLUSIVE MODE"))
+        snapshot = asyncio.create_task(StockHistoryCRUD().take_snapshot(session))
+        await asyncio.sleep(0.2)
+
+        await writer.execute(text("SET LOCAL lock_timeout = 2000"))
+        await writer.execute(text(
+            "UPDATE stock SET quantity = quantity + 1 WHERE product_id = :p AND warehouse_id = :w"
+        ), {"p": product_id, "w": warehouse_id})
+        await writer.commit()
+
+        assert not snapshot.done()
+        await blocker.commit()
+        taken_at = await asyncio.wait_for(snapshot, 5)
+
+    quantity = await session.scalar(select(StockSnapshot.quantity).where(StockSnapshot.taken_at == taken_at))
+    assert quantity == Decimal("5")
+
+
+async def test_prune_keeps_the_newest_run_before_the_cutoff(session, stock):
+    product_id, warehouse_id = stock
+    now = datetime.now()
+    runs = [now - timedelta(days=days) for days in (10, 5, 1)]
+
+    for taken_at in runs:
+        session.add(StockSnapshotRun(taken_at=taken_at, last_operation_id=0))
+        await session.flush()
+        session.add(StockSnapshot(taken_at=taken_at, product_id=product_id, warehouse_id=warehouse_id, quantity=1))
+    await session.commit()
+
+    assert await StockHistoryCRUD().prune_snapshots(session, timedelta(days=3)) == 1
+
+    assert (await session.scalars(select(StockSnapshotRun.taken_at).order_by(StockSnapshotRun.taken_at))).all() == runs[1:]
+    assert await session.scalar(select(func.count()).select_from(StockSnapshot)) == 2
@@ -0,0 +1,27 @@
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from app.crud.stock import StockCRUD
+from app.db.models import Product, Stock, Warehouse
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_lookup_matches_pairs_not_their_cross_product(session):
+    first, second = Product(name="p1", sku="SKU-1", unit="pcs"), Product(name="p2", sku="SKU-2", unit="pcs")
+    east, west = Warehouse(name="east", location="x"), Warehouse(name="west", location="y")
+    session.add_all([first, second, east, west])
+    await session.flush()
+    session.add_all([
+        Stock(product_id=product.id, warehouse_id=warehouse.id, quantity=Decimal("1"))
+        for product in (first, second) for warehouse in (east, west)
+    ])
+    await session.commit()
+
+    keys = [(first.id, east.id), (second.id, west.id), (first.id, east.id), (uuid.uuid4(), east.id)]
+    stocks = await StockCRUD().get_stocks_by_keys(keys, session)
+
+    assert set(stocks) == {(first.id, east.id), (second.id, west.id)}
@@ -0,0 +1,74 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, text
+
+from app.crud.stock_summary import StockSummaryCRUD
+from app.crud.warehouse import WarehouseCRUD
+from app.db.models import Product, Stock, User, Warehouse
+from app.db.session import SessionLocal
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_deactivating_twice_leaves_product_total_alone(session):
+    product = Product(name="p", sku="SKU-1", unit="pcs")
+    kept, closed = Warehouse(name="kept", location="x"), Warehouse(name="closed", location="x")
+    session.add_all([product, kept, closed])
+    await session.flush()
+    session.add_all([
+        Stock(product_id=product.id, warehouse_id=kept.id, quantity=Decimal("4")),
+        Stock(product_id=product.id, warehouse_id=closed.id, quantity=Decimal("6")),
+    ])
+    await session.flush()
+    await StockSummaryCRUD().rebuild(session)
+    await session.commit()
+
+    product_id, closed_id = product.id, closed.id
+    summary_crud = StockSummaryCRUD()
+    assert await summary_crud.get_product_quantity(product_id, session) == Decimal("10")
+
+    await WarehouseCRUD().deactivate_object(closed_id, session)
+    assert await summary_crud.get_product_quantity(product_id, session) == Decimal("4")
+
+    with pytest.raises(HTTPException) as error:
+        await WarehouseCRUD().deactivate_object(closed_id, session)
+    assert error.value.status_code == 409
+
+    await session.rollback()
+    assert await summary_crud.get_product_quantity(product_id, session) == Decimal("4")
+    assert await summary_crud.get_warehouse_quantity(closed_id, session) == Decimal("6")
+
+
+async def test_deactivate_does_not_deadlock_with_a_stock_writer(session):
+    user = User(firstname="a", lastname="b", email="a@example.com", role="admin")
+    product = Product(name="p", sku="SKU-1", unit="pcs")
+    warehouse = Warehouse(name="w", location="x")
+    session.add_all([user, product, warehouse])
+    await session.flush()
+    session.add(Stock(product_id=product.id, warehouse_id=warehouse.id, quantity=Decimal("5")))
+    await session.commit()
+    user_id, product_id, warehouse_id = user.id, product.id, warehouse.id
+
+    # the order _apply_batch uses: the stock row first, then the operation
+    # INSERT, whose foreign key check locks the warehouse row
+    async with SessionLocal() as writer, SessionLocal() as closer:
+        await writer.execute(text(
+            "UPDATE stock SET quantity = quantity + 1 WHERE product_id = :p AND warehouse_id = :w"
+        ), {"p": product_id, "w": warehouse_id})
+
+        deactivate = asyncio.create_task(WarehouseCRUD().deactivate_object(warehouse_id, closer))
+        await asyncio.sleep(0.2)
+
+        await writer.execute(text(
+            "INSERT INTO inventory_operation (type, quantity, product_id, to_warehouse_id, created_at, created_by) "
+            "VALUES ('inbound', 1, :p, :w, now(), :u)"
+        ), {"p": product_id, "w": warehouse_id, "u": user_id})
+        await writer.commit()
+
+        await asyncio.wait_for(deactivate, 5)
+
+    assert await session.scalar(select(Warehouse.is_active).where(Warehouse.id == warehouse_id)) is False